@@ -11,15 +11,20 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import logging
+
 from django.template import defaultfilters as d_filters
 
 from django.utils.translation import pgettext_lazy
 from django.utils.translation import ugettext_lazy as _
 from django.utils.translation import ungettext_lazy
 
+from horizon import exceptions
 from horizon import tables
 from horizon.utils import filters
 
+from dbaas_ui.shortcuts import api_cache
+from dbaas_ui.shortcuts import batch_rows
 from dbaas_ui.shortcuts import tasks
 
 from trove_dashboard import api as trove_api
@@ -77,17 +82,71 @@ class LaunchLink(tables.LinkAction):
     icon = "camera"
 
 
-class UpdateRowBackups(tables.Row):
-    ajax = True
-
-    def get_data(self, request, backup_id):
-        backup = trove_api.trove.backup_get(request, backup_id)
+def get_backup_instances(request, backups):
+    # Resolve the instances the backups were taken of, returning a dict of
+    # instance id to instance.  Instances still in the cross request
+    # instance cache are used as is; if any are missing, the instance list
+    # is retrieved once to resolve them all (rather than one instance_get
+    # per backup).  Instances that are not in the list are retrieved one at
+    # a time, and are 'Not Found' if they have been deleted since the
+    # backup was taken (or can't be retrieved just now); only instances
+    # actually retrieved are kept in the instance cache.
+    __method__ = "tables.get_backup_instances"
+    instances = {}
+    missing = set()
+    for inst_id in set(backup.instance_id for backup in backups):
+        instance = api_cache.instance_cache.get(
+            api_cache.instance_cache_key(request, inst_id))
+        if instance is None:
+            missing.add(inst_id)
+        else:
+            instances[inst_id] = instance
+
+    if missing:
+        try:
+            for instance in api_cache.list_all_instances(request, missing):
+                api_cache.instance_cache.set(
+                    api_cache.instance_cache_key(request, instance.id),
+                    instance)
+                if instance.id in missing:
+                    instances[instance.id] = instance
+        except Exception as e:
+            # Fall back to retrieving the instances one at a time
+            logging.error("%s: Exception retrieving instances: %s",
+                          __method__, e)
+
+    for inst_id in missing.difference(instances):
         try:
-            backup.instance = trove_api.trove.instance_get(request,
-                                                           backup.instance_id)
+            instance = trove_api.trove.instance_get(request, inst_id)
         except Exception:
-            pass
-        return backup
+            instances[inst_id] = _('Not Found')
+            continue
+        instances[inst_id] = instance
+        api_cache.instance_cache.set(
+            api_cache.instance_cache_key(request, inst_id), instance)
+
+    return instances
+
+
+class UpdateRowBackups(batch_rows.BatchUpdateRow):
+    batch_update_url = "horizon:dbaas_ui:backups:row_status"
+
+    def get_batch_data(self, request, backup_ids):
+        # The polled backups are retrieved by id, concurrently (backup_list
+        # only returns its first page, which need not hold them all).  A
+        # backup that no longer exists is left out so its row is removed;
+        # any other error fails the poll, leaving the rows as they are.
+        backups = []
+        outcomes = api_cache.fan_out(request, 'backup_get', backup_ids)
+        for backup, error in outcomes:
+            if error is None:
+                backups.append(backup)
+            elif not isinstance(error, exceptions.NOT_FOUND):
+                raise error
+        instances = get_backup_instances(request, backups)
+        for backup in backups:
+            backup.instance = instances.get(backup.instance_id)
+        return dict((backup.id, backup) for backup in backups)
 
 
 def get_datastore(instance):
@@ -21,6 +21,9 @@ urlpatterns = patterns(
     # Index provides main page
     url(r'^$', views.IndexView.as_view(), name='index'),
 
+    # Status of several (pending) rows of the backups table
+    url(r'^row_status/$', views.RowStatusView.as_view(), name='row_status'),
+
     url(r'^(?P<backup_id>[^/]+)/backup/$',
         views.BackupDetailsView.as_view(), name='detail'),
 )
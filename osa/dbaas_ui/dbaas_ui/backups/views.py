@@ -23,6 +23,7 @@ from horizon import views as horizon_views
 import logging
 
 from dbaas_ui.backups import tables
+from dbaas_ui.shortcuts import batch_rows
 
 from trove_dashboard import api as trove_api
 
@@ -34,16 +35,7 @@ class IndexView(baseTables.DataTableView):
 
     def _get_extra_data(self, backup):
         """Apply extra info to the backup."""
-        inst_id = backup.instance_id
-        if not hasattr(self, '_instances'):
-            self._instances = {}
-        instance = self._instances.get(inst_id)
-        if instance is None:
-            try:
-                instance = trove_api.trove.instance_get(self.request, inst_id)
-            except Exception:
-                instance = _('Not Found')
-        backup.instance = instance
+        backup.instance = self._instances.get(backup.instance_id)
         return backup
 
     def get_data(self):
@@ -51,6 +43,9 @@ class IndexView(baseTables.DataTableView):
         backups = []
         try:
             backups = trove_api.trove.backup_list(self.request)
+            # Resolve all of the backups' instances up front
+            self._instances = tables.get_backup_instances(self.request,
+                                                          backups)
             backups = map(self._get_extra_data, backups)
         except Exception:
             msg = _('Unable to retrieve list of backups.')
@@ -58,6 +53,10 @@ class IndexView(baseTables.DataTableView):
         return backups
 
 
+class RowStatusView(batch_rows.BatchRowStatusView):
+    table_class = tables.BackupsTable
+
+
 class BackupDetailsView(horizon_views.APIView):
     template_name = "dbaas_ui/backups/_backup_detail_overview.html"
     # Ensure the title indicates the type of item being viewed (instance)
@@ -11,18 +11,25 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from django.core.urlresolvers import reverse
 from django.template import defaultfilters as d_filters
+from django.utils.html import format_html
+from django.utils import http
 
 from django.utils.translation import pgettext_lazy
 from django.utils.translation import ugettext_lazy as _
 from django.utils.translation import ungettext_lazy
 
+import six
+
 from horizon import tables
 from horizon.templatetags import sizeformat
 from horizon.utils import filters
 
 from dbaas_ui.backups.tables import BACKUPS_STATUS_CHOICES
 from dbaas_ui.backups.tables import BACKUPS_STATUS_DISPLAY_CHOICES
+from dbaas_ui.shortcuts import api_cache
+from dbaas_ui.shortcuts import batch_rows
 from dbaas_ui.shortcuts import tasks
 
 from trove_dashboard import api as trove_api
@@ -89,21 +96,30 @@ class DeleteInstance(tables.DeleteAction):
 
     def delete(self, request, obj_id):
         trove_api.trove.instance_delete(request, obj_id)
+        api_cache.invalidate_instance(request, obj_id)
 
 
-class UpdateRowInstances(tables.Row):
-    ajax = True
+class UpdateRowInstances(batch_rows.BatchUpdateRow):
+    batch_update_url = "horizon:dbaas_ui:instances:row_status"
 
-    def get_data(self, request, instance_id):
-        instance = trove_api.trove.instance_get(request, instance_id)
+    def get_batch_data(self, request, instance_ids):
+        # One instance list (and one flavor list) call refreshes all of the
+        # polled rows
+        wanted = set(instance_ids)
+        instances = [instance for instance in
+                     api_cache.list_all_instances(request, wanted)
+                     if instance.id in wanted]
         try:
-            flavor_id = instance.flavor['id']
-            instance.full_flavor = trove_api.trove.flavor_get(request,
-                                                              flavor_id)
+            flavors = dict((six.text_type(flavor.id), flavor) for flavor in
+                           trove_api.trove.flavor_list(request))
         except Exception:
-            pass
-        instance.host = get_host(instance)
-        return instance
+            flavors = {}
+        for instance in instances:
+            flavor = flavors.get(six.text_type(instance.flavor['id']))
+            if flavor is not None:
+                instance.full_flavor = flavor
+            instance.host = get_host(instance)
+        return dict((instance.id, instance) for instance in instances)
 
 
 def get_host(instance):
@@ -141,11 +157,23 @@ def get_volume_size(instance):
     return _("Not available")
 
 
+def format_databases(access):
+    databases = [db.name for db in access]
+    databases.sort()
+    return ', '.join(databases)
+
+
 def get_databases(user):
     if hasattr(user, "access"):
-        databases = [db.name for db in user.access]
-        databases.sort()
-        return ', '.join(databases)
+        return format_databases(user.access)
+    if getattr(user, "access_pending", False):
+        # The user's access was not retrieved in time -- let the page
+        # load it when asked for.
+        url = reverse('horizon:dbaas_ui:instances:user_access',
+                      args=(user.instance.id, user.name))
+        return format_html('<a href="#" class="load-user-access" '
+                           'data-access-url="{0}">{1}</a>',
+                           url, _("Show databases"))
     return _("-")
 
 
@@ -162,7 +190,28 @@ def is_incremental(obj):
     return hasattr(obj, 'parent_id') and obj.parent_id is not None
 
 
-class UsersTable(tables.DataTable):
+class PaginatedTabTable(tables.DataTable):
+    # A table, shown in one of the instance details tabs, that holds one
+    # page of a Trove list at a time.  The next page starts at the marker
+    # returned by Trove.  Trove's list calls can't be sorted, so the rows
+    # are shown in Trove's order.
+    #
+    # next_marker and tab_query are set by the tab that loads the table.
+    next_marker = None
+    tab_query = None
+
+    def get_marker(self):
+        if not self.next_marker:
+            return ''
+        return http.urlquote_plus(self.next_marker)
+
+    def get_pagination_string(self):
+        params = [self.tab_query] if self.tab_query else []
+        params.append(super(PaginatedTabTable, self).get_pagination_string())
+        return "&".join(params)
+
+
+class UsersTable(PaginatedTabTable):
     name = tables.Column("name", verbose_name=_("User Name"))
     # host = tables.Column("host", verbose_name=_("Allowed Host"))
     databases = tables.Column(get_databases, verbose_name=_("Databases"))
@@ -172,12 +221,13 @@ class UsersTable(tables.DataTable):
         verbose_name = _("Users")
         table_actions = (tasks.CreateUserLink, tasks.GenericFilterAction,)
         row_actions = (tasks.ManageUserDBAccess, tasks.DeleteUserLink,)
+        pagination_param = "users_marker"
 
     def get_object_id(self, datum):
         return datum.name
 
 
-class DatabaseTable(tables.DataTable):
+class DatabaseTable(PaginatedTabTable):
     name = tables.Column("name", verbose_name=_("Database Name"))
 
     class Meta(object):
@@ -185,12 +235,13 @@ class DatabaseTable(tables.DataTable):
         verbose_name = _("Databases")
         table_actions = (tasks.CreateDatabaseLink, tasks.GenericFilterAction,)
         row_actions = (tasks.DeleteDatabaseLink,)
+        pagination_param = "databases_marker"
 
     def get_object_id(self, datum):
         return datum.name
 
 
-class InstanceBackupsTable(tables.DataTable):
+class InstanceBackupsTable(PaginatedTabTable):
     name = tables.Column("name",
                          link="horizon:dbaas_ui:backups:detail",
                          verbose_name=_("Name"))
@@ -218,6 +269,7 @@ class InstanceBackupsTable(tables.DataTable):
         status_columns = ["status"]
         table_actions = (tasks.GenericFilterAction, tasks.CreateBackupLink)
         row_actions = (tasks.RestoreFromBackupLink, tasks.DeleteBackupLink,)
+        pagination_param = "backups_marker"
 
 
 class InstancesTable(tables.DataTable):
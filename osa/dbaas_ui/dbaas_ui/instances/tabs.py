@@ -12,15 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from django.conf import settings
 from django import template
 from django.utils.translation import ugettext_lazy as _
 
 from horizon import exceptions
+from horizon import messages
 from horizon import tabs
+from horizon.utils import functions as utils
 
 import logging
 
 from dbaas_ui.instances import tables
+from dbaas_ui.shortcuts import api_cache
 from dbaas_ui.shortcuts import tasks
 
 from trove_dashboard import api as trove_api
@@ -29,6 +33,10 @@ from trove_dashboard.content.databases import db_capability as \
 
 from dbaas_ui.shortcuts import db_capability as dbaas_ui_db_capability
 
+# Number of seconds the Users tab waits for the users' database access
+# before rendering (the rest is loaded by the page on request)
+USER_ACCESS_BUDGET = getattr(settings, 'DBAAS_UI_USER_ACCESS_BUDGET', 5)
+
 
 class InstanceOverviewTab(tabs.Tab):
     name = _("Overview")
@@ -75,12 +83,35 @@ class InstanceOverviewTab(tabs.Tab):
         return datastore
 
 
-class UserTab(tabs.TableTab):
+class PaginatedTableTab(tabs.TableTab):
+    # A tab whose table lists one page of a Trove list at a time (see
+    # tables.PaginatedTabTable), so the time taken to render the tab and
+    # the memory used do not grow with the size of the instance.
+    template_name = "horizon/common/_detail_table.html"
+
+    def list_page(self, table_name, api_name, *args):
+        # Retrieve the page of the list (api_cache.list_page) the table's
+        # marker parameter points at, and remember where the next page
+        # starts.
+        table = self._tables[table_name]
+        marker = self.request.GET.get(table._meta.pagination_param)
+        table.tab_query = self.get_query_string()
+        page = api_cache.list_page(self.request, api_name, *args,
+                                   limit=utils.get_page_size(self.request),
+                                   marker=marker)
+        table.next_marker = getattr(page, 'next', None)
+        return list(page)
+
+    def has_more_data(self, table):
+        return bool(table.next_marker)
+
+
+class UserTab(PaginatedTableTab):
     table_classes = [tables.UsersTable]
     name = _("Users")
     slug = "users_tab"
     instance = None
-    template_name = "horizon/common/_detail_table.html"
+    template_name = "dbaas_ui/instances/_users_table.html"
     preload = False
 
     def get_users_data(self):
@@ -88,27 +119,8 @@ class UserTab(tabs.TableTab):
         instance = self.tab_group.kwargs['instance']
         instance_type = instance.datastore['type']
         try:
-            # Retrieve all users for the selected instance
-            data = trove_api.trove.users_list(self.request, instance.id)
-
-            for user in data:
-                user.instance = instance
-                try:
-                    # Set the user's access to the instance
-                    user.access = trove_api.trove.user_list_access(
-                        self.request,
-                        instance.id,
-                        user.name)
-                except exceptions.NOT_FOUND:
-                    pass
-                except Exception as e:
-                    logging.error("%s: Exception received trying to retrieve "
-                                  " user information for instance %s.  "
-                                  "Exception : %s",
-                                  __method__, instance.name, e)
-                    msg = _('Unable to retrieve user data for the selected '
-                            'instance.')
-                    exceptions.handle(self.request, msg)
+            # Retrieve a page of users for the selected instance
+            data = self.list_page('users', 'users_list', instance.id)
         except Exception as e:
             logging.error("%s: Exception received trying to retrieve user "
                           "information for instance %s.  "
@@ -118,19 +130,45 @@ class UserTab(tabs.TableTab):
             if (dbaas_ui_db_capability.can_support_users(instance_type)):
                 msg = _('Unable to retrieve user data for selected instance.')
                 exceptions.handle(self.request, msg)
-            data = []
+            return []
+
+        # Retrieve each user's access to the instance concurrently, waiting
+        # no longer than the tab's time budget.  The calls not started by
+        # then are cancelled; the databases of those users are loaded by
+        # the page when asked for.
+        outcomes = api_cache.fan_out(self.request, 'user_list_access',
+                                     [(instance.id, user.name)
+                                      for user in data],
+                                     budget=USER_ACCESS_BUDGET)
+        failed = False
+        for user, (access, error) in zip(data, outcomes):
+            user.instance = instance
+            if error is None:
+                # Set the user's access to the instance
+                user.access = access
+            elif isinstance(error, api_cache.FanOutTimeout):
+                user.access_pending = True
+            elif not isinstance(error, exceptions.NOT_FOUND):
+                logging.error("%s: Exception received trying to retrieve "
+                              " user information for instance %s.  "
+                              "Exception : %s",
+                              __method__, instance.name, error)
+                failed = True
+        if failed:
+            msg = _('Unable to retrieve user data for the selected '
+                    'instance.')
+            messages.error(self.request, msg)
         return data
 
     def allowed(self, request):
         return tasks.has_user_add_perm(request)
 
 
-class InstanceBackupsTab(tabs.TableTab):
+class InstanceBackupsTab(PaginatedTableTab):
     table_classes = [tables.InstanceBackupsTable]
     name = _("Backups")
     slug = "instance_backups_tab"
     instance = None
-    template_name = "horizon/common/_detail_table.html"
     preload = False
 
     def get_backups_data(self):
@@ -139,8 +177,8 @@ class InstanceBackupsTab(tabs.TableTab):
         # retrieve backups for the selected instance
         backups = []
         try:
-            backups = trove_api.trove.instance_backups(self.request,
-                                                       instance.id)
+            backups = self.list_page('backups', 'instance_backups',
+                                     instance.id)
         except Exception:
             msg = _('Unable to retrieve list of backups for '
                     'instance: %s.', instance.name)
@@ -148,19 +186,18 @@ class InstanceBackupsTab(tabs.TableTab):
         return backups
 
 
-class DatabaseTab(tabs.TableTab):
+class DatabaseTab(PaginatedTableTab):
     table_classes = [tables.DatabaseTable]
     name = _("Databases")
     slug = "database_tab"
     instance = None
-    template_name = "horizon/common/_detail_table.html"
     preload = False
 
     def get_databases_data(self):
         instance = self.tab_group.kwargs['instance']
         instance_type = instance.datastore['type']
         try:
-            data = trove_api.trove.database_list(self.request, instance.id)
+            data = self.list_page('databases', 'database_list', instance.id)
             for db in data:
                 setattr(db, 'instance', instance)
         except Exception:
@@ -21,6 +21,13 @@ urlpatterns = patterns(
     # Index provides main page
     url(r'^$', views.IndexView.as_view(), name='index'),
 
+    # Status of several (pending) rows of the instances table
+    url(r'^row_status/$', views.RowStatusView.as_view(), name='row_status'),
+
     url(r'^(?P<instance_id>[^/]+)/instance/$',
         views.InstanceDetailsView.as_view(), name='detail'),
+
+    # Databases a user has access to (loaded on request by the Users tab)
+    url(r'^(?P<instance_id>[^/]+)/(?P<user_name>[^/]+)/user_access/$',
+        views.UserAccessView.as_view(), name='user_access'),
 )
@@ -15,7 +15,9 @@ from collections import OrderedDict
 import logging
 
 from django.core.urlresolvers import reverse
+from django import http
 from django.utils.translation import ugettext_lazy as _
+from django.views import generic
 
 import six
 
@@ -27,6 +29,7 @@ from horizon.utils import memoized
 from trove_dashboard import api as trove_api
 
 from dbaas_ui.instances import tables, tabs
+from dbaas_ui.shortcuts import batch_rows
 
 
 class IndexView(baseTables.DataTableView):
@@ -72,6 +75,30 @@ class IndexView(baseTables.DataTableView):
         return instances
 
 
+class RowStatusView(batch_rows.BatchRowStatusView):
+    table_class = tables.InstancesTable
+
+
+class UserAccessView(generic.View):
+    # Returns the databases a user has access to, for a user whose access
+    # was not retrieved in time when the Users tab was rendered.
+    def get(self, request, instance_id, user_name):
+        __method__ = "views.UserAccessView.get"
+        try:
+            access = trove_api.trove.user_list_access(request, instance_id,
+                                                      user_name)
+        except exceptions.NOT_FOUND:
+            access = []
+        except Exception as e:
+            logging.error("%s: Exception received trying to retrieve the "
+                          "databases user %s has access to on instance %s. "
+                          " Exception is: %s", __method__, user_name,
+                          instance_id, e)
+            return http.HttpResponse(status=500)
+        databases = tables.format_databases(access)
+        return http.JsonResponse({'databases': databases or '-'})
+
+
 class InstanceDetailsView(baseTabs.TabView):
     tab_group_class = tabs.InstanceDetailsTabs
     template_name = 'horizon/common/_detail.html'
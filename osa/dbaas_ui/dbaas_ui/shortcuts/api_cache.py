@@ -0,0 +1,381 @@
+# Copyright 2017, IBM US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import threading
+import time
+
+from django.conf import settings
+
+from trove_dashboard import api as trove_api
+
+# Name of the attribute the cache is stored under on the request
+REQUEST_CACHE_ATTR = '_dbaas_ui_trove_cache'
+
+# Trove API calls that only read data and are therefore safe to memoize
+# for the life of a single HTTP request.
+CACHEABLE_CALLS = frozenset((
+    'backup_get',
+    'backup_list',
+    'database_list',
+    'datastore_flavors',
+    'datastore_list',
+    'datastore_version_list',
+    'flavor_get',
+    'flavor_list',
+    'instance_backups',
+    'instance_get',
+    'instance_list',
+    'user_list_access',
+    'users_list',
+))
+
+
+def _users_page(request, instance_id, limit=None, marker=None):
+    return trove_api.trove.troveclient(request).users.list(
+        instance_id, limit=limit, marker=marker)
+
+
+def _databases_page(request, instance_id, limit=None, marker=None):
+    return trove_api.trove.troveclient(request).databases.list(
+        instance_id, limit=limit, marker=marker)
+
+
+def _instance_backups_page(request, instance_id, limit=None, marker=None):
+    return trove_api.trove.troveclient(request).instances.backups(
+        instance_id, limit=limit, marker=marker)
+
+
+# Trove list calls that can be retrieved a page at a time with list_page,
+# keyed by the name of the (unpaged) trove_api call they correspond to.
+# The trove_api calls take no marker, so the pages are listed through its
+# troveclient.
+PAGED_CALLS = {
+    'users_list': _users_page,
+    'database_list': _databases_page,
+    'instance_backups': _instance_backups_page,
+}
+
+# Maximum number of Trove calls fan_out keeps in flight at once, and the
+# number of seconds to wait for all of those calls before giving up on the
+# ones not yet complete.
+FANOUT_CONCURRENCY = getattr(settings, 'DBAAS_UI_FANOUT_CONCURRENCY', 8)
+FANOUT_TIMEOUT = getattr(settings, 'DBAAS_UI_FANOUT_TIMEOUT', 10)
+
+# Maximum number of fan_out worker pools kept for reuse between fan-outs.
+FANOUT_IDLE_POOLS = getattr(settings, 'DBAAS_UI_FANOUT_IDLE_POOLS', 4)
+
+# Number of seconds instances are kept in the cross request instance cache,
+# and the maximum number of instances it holds.
+INSTANCE_CACHE_TTL = getattr(settings, 'DBAAS_UI_INSTANCE_CACHE_TTL', 10)
+INSTANCE_CACHE_SIZE = getattr(settings, 'DBAAS_UI_INSTANCE_CACHE_SIZE', 1000)
+
+# Number of seconds the datastore catalog used to build the launch instance
+# form (datastores, their versions and flavors, and the Glance image ids) is
+# kept, and the maximum number of projects it is kept for.
+CATALOG_CACHE_TTL = getattr(settings, 'DBAAS_UI_CATALOG_CACHE_TTL', 60)
+CATALOG_CACHE_SIZE = getattr(settings, 'DBAAS_UI_CATALOG_CACHE_SIZE', 100)
+
+
+class FanOutTimeout(Exception):
+    pass
+
+
+# Worker pools not in use by a fan-out, kept for the next ones.  Each
+# fan-out has a pool to itself while it runs, so a fan-out that times out
+# can cancel its queued calls by terminating its pool without affecting
+# the fan-outs of other requests.
+_idle_pools = []
+_idle_pools_lock = threading.Lock()
+
+
+def _take_pool():
+    with _idle_pools_lock:
+        if _idle_pools:
+            return _idle_pools.pop()
+    return ThreadPool(FANOUT_CONCURRENCY)
+
+
+def _release_pool(pool, cancel=False):
+    # Terminating the pool drops the calls still queued in it.  Calls
+    # already running can't be stopped; their workers exit once they return.
+    if cancel:
+        pool.terminate()
+        return
+    with _idle_pools_lock:
+        if len(_idle_pools) < FANOUT_IDLE_POOLS:
+            _idle_pools.append(pool)
+            return
+    pool.close()
+
+
+class TroveRequestCache(object):
+    # Memoizes Trove read calls made while servicing one HTTP request.
+    # Each distinct call (api name plus arguments) is sent to Trove at most
+    # once; later callers get the stored result.  Exceptions are not stored
+    # so every caller still gets to handle (and report) a failure itself.
+    #
+    # 'calls' counts the requests actually sent to Trove and 'hits' counts
+    # those answered from the cache, both keyed by api name.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results = {}
+        self.calls = collections.Counter()
+        self.hits = collections.Counter()
+
+    @staticmethod
+    def _build_key(api_name, args, kwargs):
+        return (api_name, args, tuple(sorted(kwargs.items())))
+
+    def call(self, request, api_name, *args, **kwargs):
+        if api_name not in CACHEABLE_CALLS:
+            raise ValueError("Trove call %s can not be cached" % api_name)
+        return self._call(getattr(trove_api.trove, api_name), request,
+                          api_name, args, kwargs)
+
+    def call_paged(self, request, api_name, *args, **kwargs):
+        # As call, for one page of a paged list (see list_page)
+        if api_name not in PAGED_CALLS:
+            raise ValueError("Trove call %s can not be paged" % api_name)
+        return self._call(PAGED_CALLS[api_name], request, api_name, args,
+                          kwargs)
+
+    def _call(self, func, request, api_name, args, kwargs):
+        key = self._build_key(api_name, args, kwargs)
+        with self._lock:
+            if key in self._results:
+                self.hits[api_name] += 1
+                return self._results[key]
+
+        # Make the call outside of the lock so that independent calls
+        # made from worker threads can proceed concurrently.
+        result = func(request, *args, **kwargs)
+        with self._lock:
+            self.calls[api_name] += 1
+            self._results.setdefault(key, result)
+            return self._results[key]
+
+    def prime(self, api_name, result, *args, **kwargs):
+        # Store a result obtained some other way (for example, one instance
+        # out of an instance_list) so a later call for it is not sent.
+        key = self._build_key(api_name, args, kwargs)
+        with self._lock:
+            self._results.setdefault(key, result)
+
+    def invalidate(self, api_name=None):
+        # Forget stored results -- all of them, or those for one api name.
+        with self._lock:
+            if api_name is None:
+                self._results.clear()
+            else:
+                for key in [k for k in self._results if k[0] == api_name]:
+                    del self._results[key]
+
+
+class TTLCache(object):
+    # A thread safe cache, shared across requests, holding at most max_size
+    # entries, each for at most ttl seconds.  When full, the entry stored
+    # longest ago is dropped to make room.
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            while self._entries and len(self._entries) >= self.max_size:
+                self._entries.popitem(last=False)
+            self._entries[key] = (time.time() + self.ttl, value)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+# Instances keyed by (project id, instance id).  Used where instances are
+# only needed to describe something else (for example, the instance a
+# backup was taken of) so a slightly stale copy is acceptable.
+instance_cache = TTLCache(INSTANCE_CACHE_TTL, INSTANCE_CACHE_SIZE)
+
+
+def instance_cache_key(request, instance_id):
+    return (request.user.project_id, instance_id)
+
+
+def invalidate_instance(request, instance_id):
+    # Drop an instance that has just been changed (renamed, deleted) from
+    # the instance cache
+    instance_cache.invalidate(instance_cache_key(request, instance_id))
+
+
+# Datastore catalogs keyed by project id.  The catalog only changes when an
+# administrator changes datastores, flavors or images, so it is kept for
+# longer than instances.
+catalog_cache = TTLCache(CATALOG_CACHE_TTL, CATALOG_CACHE_SIZE)
+
+
+def invalidate_catalog(request):
+    # Drop the project's datastore catalog, so the next launch form built
+    # for the project retrieves it again
+    catalog_cache.invalidate(request.user.project_id)
+
+
+def list_all_instances(request, wanted_ids=None):
+    # Retrieve the instances of the project, following the instance list's
+    # pages.  When wanted_ids is given, stop as soon as all of those
+    # instances have been seen (usually the first page).
+    wanted = set(wanted_ids) if wanted_ids is not None else None
+    instances = []
+    marker = None
+    while True:
+        page = trove_api.trove.instance_list(request, marker=marker)
+        instances.extend(page)
+        if wanted is not None:
+            wanted.difference_update(instance.id for instance in page)
+            if not wanted:
+                return instances
+        marker = getattr(page, 'next', None)
+        if not marker:
+            return instances
+
+
+def get_cache(request):
+    # Return the cache bound to the request, creating it on first use
+    cache = getattr(request, REQUEST_CACHE_ATTR, None)
+    if cache is None:
+        cache = TroveRequestCache()
+        setattr(request, REQUEST_CACHE_ATTR, cache)
+    return cache
+
+
+def call(request, api_name, *args, **kwargs):
+    # Perform a Trove read call through the request's cache
+    return get_cache(request).call(request, api_name, *args, **kwargs)
+
+
+def list_page(request, api_name, *args, **kwargs):
+    # Retrieve one page (limit and marker keyword arguments) of one of the
+    # PAGED_CALLS lists through the request's cache.  The page's 'next'
+    # attribute is the marker of the next page, if there is one.
+    return get_cache(request).call_paged(request, api_name, *args, **kwargs)
+
+
+def fan_out(request, api_name, arg_list, budget=None):
+    # Perform the same Trove read call once for each argument in arg_list
+    # (for example, users_list for each instance id) using a bounded pool
+    # of worker threads, so the total wait is roughly that of the slowest
+    # call rather than the sum of all of them.  An argument that is a tuple
+    # is passed as several arguments (for example, (instance id, user name)
+    # for user_list_access).
+    #
+    # Returns a list of (result, error) tuples in the order of arg_list.
+    # When a call fails, or has not completed FANOUT_TIMEOUT seconds after
+    # the fan-out started, result is None and error holds the exception --
+    # callers decide how to report it.  If budget is given, no call is
+    # waited for once budget seconds have passed in total; those calls get
+    # a FanOutTimeout error.  When the fan-out times out or runs out of
+    # budget, its calls not yet started are cancelled; a call already
+    # running is left to finish in the background, it does not hold up the
+    # response.
+    outcomes = []
+    if not arg_list:
+        return outcomes
+
+    call_args = [arg if isinstance(arg, tuple) else (arg,)
+                 for arg in arg_list]
+    wait = FANOUT_TIMEOUT if budget is None else min(budget, FANOUT_TIMEOUT)
+    deadline = time.time() + wait
+    cache = get_cache(request)
+    pool = _take_pool()
+    timed_out = False
+    try:
+        pending = [pool.apply_async(cache.call, (request, api_name) + args)
+                   for args in call_args]
+        for args, async_result in zip(call_args, pending):
+            timeout = max(0, deadline - time.time())
+            try:
+                outcomes.append((async_result.get(timeout), None))
+            except multiprocessing.TimeoutError:
+                error = FanOutTimeout(
+                    "%s(%s) did not complete in time" %
+                    (api_name, ', '.join(str(arg) for arg in args)))
+                outcomes.append((None, error))
+                timed_out = True
+            except Exception as e:
+                outcomes.append((None, e))
+    finally:
+        _release_pool(pool, cancel=timed_out)
+    return outcomes
+
+
+class BackgroundCall(object):
+    # A call started by submit(), running on a worker pool taken from the
+    # fan-out pools while the caller does other work.
+    def __init__(self, func, args):
+        self._name = getattr(func, '__name__', repr(func))
+        self._deadline = time.time() + FANOUT_TIMEOUT
+        self._pool = _take_pool()
+        self._async_result = self._pool.apply_async(func, args)
+
+    def outcome(self):
+        # Wait for the call, at most until FANOUT_TIMEOUT seconds after it
+        # was submitted, and return a (result, error) tuple as fan_out
+        # does.  The pool is given back either way.
+        timed_out = False
+        try:
+            timeout = max(0, self._deadline - time.time())
+            return self._async_result.get(timeout), None
+        except multiprocessing.TimeoutError:
+            timed_out = True
+            return None, FanOutTimeout("%s did not complete in time" %
+                                       self._name)
+        except Exception as e:
+            return None, e
+        finally:
+            self._release(cancel=timed_out)
+
+    def close(self):
+        # Give the pool back without waiting for the call; one that has
+        # not completed is cancelled (or left to finish in the background
+        # if it is already running).  Does nothing after outcome().
+        self._release(cancel=not self._async_result.ready())
+
+    def _release(self, cancel):
+        if self._pool is not None:
+            _release_pool(self._pool, cancel=cancel)
+            self._pool = None
+
+
+def submit(func, *args):
+    # Start func(*args) in the background, for example a non-Trove call
+    # made while Trove is being fanned out to, and return a BackgroundCall.
+    # The caller must get its outcome() or close() it.
+    return BackgroundCall(func, args)
@@ -0,0 +1,85 @@
+# Copyright 2017, IBM US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+
+from django.core.urlresolvers import reverse
+from django import http
+from django.views import generic
+
+from horizon import conf
+from horizon import exceptions
+from horizon import tables
+
+# Most rows refreshed by one batch status request
+MAX_BATCH_ROWS = 200
+
+
+class BatchUpdateRow(tables.Row):
+    # A row whose status is refreshed together with the other pending rows
+    # of its table (one request, and one Trove list call, per poll) rather
+    # than by horizon's one ajax request per row.
+    #
+    # Subclasses set batch_update_url to the name of the table's
+    # BatchRowStatusView url, and implement get_data (as for horizon's
+    # ajax rows) or, to retrieve the rows with fewer calls, get_batch_data.
+    ajax = False
+    batch_update_url = None
+
+    def load_cells(self, datum=None):
+        super(BatchUpdateRow, self).load_cells(datum)
+        if self.batch_update_url:
+            interval = conf.HORIZON_CONFIG['ajax_poll_interval']
+            self.attrs['data-update-interval'] = interval
+            self.attrs['data-batch-update-url'] = reverse(
+                self.batch_update_url)
+            self.classes.append("batch-update")
+
+    def get_batch_data(self, request, obj_ids):
+        # Return a dict of object id to the updated data for those objects
+        # (ids that no longer exist are left out).  By default each object
+        # is retrieved in turn with get_data.
+        data = {}
+        for obj_id in obj_ids:
+            try:
+                data[obj_id] = self.get_data(request, obj_id)
+            except exceptions.NOT_FOUND:
+                continue
+        return data
+
+
+class BatchRowStatusView(generic.View):
+    # Renders the rows of table_class identified by the obj_id query
+    # parameters and returns them as JSON: {"rows": {id: html}}.  A row
+    # whose object no longer exists has a value of null so the page can
+    # remove it.
+    table_class = None
+
+    def get(self, request):
+        __method__ = "batch_rows.BatchRowStatusView.get"
+        obj_ids = request.GET.getlist('obj_id')[:MAX_BATCH_ROWS]
+        table = self.table_class(request)
+        row_class = table._meta.row_class
+        try:
+            data = row_class(table).get_batch_data(request, obj_ids)
+        except Exception as e:
+            logging.error("%s: Exception retrieving row status for table "
+                          "%s.  Exception is: %s", __method__, table.name, e)
+            return http.HttpResponse(status=500)
+
+        rows = {}
+        for obj_id in obj_ids:
+            datum = data.get(obj_id)
+            rows[obj_id] = (row_class(table, datum).render()
+                            if datum is not None else None)
+        return http.JsonResponse({'rows': rows})
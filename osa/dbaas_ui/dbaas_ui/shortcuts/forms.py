@@ -11,9 +11,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from collections import OrderedDict
+
 from django.core.urlresolvers import reverse
 from django.utils.translation import ugettext_lazy as _
 
+import six
+from six.moves.urllib.parse import urlencode
+
 from horizon import exceptions
 from horizon import forms
 from horizon import messages
@@ -22,6 +27,7 @@ from horizon.utils import validators
 
 import logging
 
+from dbaas_ui.shortcuts import api_cache
 from dbaas_ui.shortcuts import db_capability
 
 from trove_dashboard import api as trove_api
@@ -47,7 +53,7 @@ def retrieve_instances(request, allowed_states=None):
     all_instances = []
     allowed_instances = []
     try:
-        all_instances = trove_api.trove.instance_list(request)
+        all_instances = api_cache.call(request, 'instance_list')
     except Exception as e:
         logging.error("%s: Exception retrieving instances: %s", __method__, e)
         msg = _('Unable to retrieve list of instances.')
@@ -97,6 +103,31 @@ def create_instance_choices(request, allowed_states=None, instanceID=None):
     return instance_choices
 
 
+def retrieve_flavors(request):
+    # Retrieve the flavor catalogue with a single call and index it by
+    # flavor id.  Returns an empty index if the list can't be retrieved
+    # (callers fall back to looking up flavors one at a time).
+    __method__ = 'forms.retrieve_flavors'
+    all_flavors = []
+    try:
+        all_flavors = api_cache.call(request, 'flavor_list')
+    except Exception as e:
+        logging.error("%s: Exception retrieving flavors: %s", __method__, e)
+
+    return OrderedDict((six.text_type(flavor.id), flavor)
+                       for flavor in all_flavors)
+
+
+def lookup_flavor(request, flavors, flavor_id):
+    # Find a flavor in an index built by retrieve_flavors -- if it is not
+    # there (for example, a flavor not visible in the list), fall back to
+    # retrieving that one flavor.
+    flavor = flavors.get(six.text_type(flavor_id))
+    if flavor is None:
+        flavor = api_cache.call(request, 'flavor_get', flavor_id)
+    return flavor
+
+
 def create_inst_fl_choices(request, allowed_states=None, instanceID=None):
     # build a list of instance choices that also includes the current
     # flavor for that instance -- filtered on a passed in list of allowed
@@ -111,55 +142,32 @@ def create_inst_fl_choices(request, allowed_states=None, instanceID=None):
         # Initial (and default) value instructs user to select an instance
         instance_choices.append((None, _("Select an instance")))
 
+    # Retrieve all flavors up front rather than one call per instance
+    flavors = retrieve_flavors(request) if all_instances else {}
+
     for inst in all_instances:
-        # start with empy flavor
-        flavor = ""
-        # initialize the displayValue for the instance (just instance name)
-        displayValue = inst.name
+        # If an instance id was passed in, then only append elements if
+        # the instance IDs match (should only be one)
+        if instanceID and not inst.id.startswith(instanceID):
+            continue
 
-        choiceValue = ""
-        # If an instance id was passed in
-        if instanceID:
-            # Then only append elements if the instance IDs match
-            # (should only be one)
-            if inst.id.startswith(instanceID):
-                # Try to retrieve the 'size' (flavor) for the instance.
-                try:
-                    flavor = trove_api.trove.flavor_get(request,
-                                                        inst.flavor['id'])
-                    # we got a flavor, so set displayValue for the instance to
-                    # the instance name and current flavor information
-                    nameVal = inst.name + ": " + flavor.name
-                    sizeVal = sizeformat.mbformat(flavor.ram) + " RAM"
-                    displayValue = nameVal + " | " + sizeVal
-                    choiceValue = inst.id + "::" + str(flavor.id)
-                    instance_choices.append((choiceValue, displayValue))
-                except Exception as e:
-                    logging.error("%s: Exception retrieving size information"
-                                  " for instance: %s.  Exception is: %s",
-                                  __method__, inst.name, e)
-                    msg = ('Unable to retrieve size information for'
-                           ' instance %s.', inst.name)
-                    exceptions.handle(request, msg)
-        else:
-            # No instance ID was passed in -- just append all instances
-            # Try to retrieve the 'size' (flavor) for the instance.
-            try:
-                flavor = trove_api.trove.flavor_get(request, inst.flavor['id'])
-                # we got a flavor, so set displayValue for the instance to the
-                # instance name and current flavor information
-                nameVal = inst.name + ": " + flavor.name
-                sizeVal = sizeformat.mbformat(flavor.ram) + " RAM"
-                displayValue = nameVal + " | " + sizeVal
-                choiceValue = inst.id + "::" + str(flavor.id)
-                instance_choices.append((choiceValue, displayValue))
-            except Exception as e:
-                logging.error("%s: Exception retrieving size information for"
-                              " instance: %s.  Exception is: %s", __method__,
-                              inst.name, e)
-                msg = ('Unable to retrieve size information for '
-                       'instance %s.', inst.name)
-                exceptions.handle(request, msg)
+        # Try to find the 'size' (flavor) for the instance.
+        try:
+            flavor = lookup_flavor(request, flavors, inst.flavor['id'])
+            # we got a flavor, so set displayValue for the instance to the
+            # instance name and current flavor information
+            nameVal = inst.name + ": " + flavor.name
+            sizeVal = sizeformat.mbformat(flavor.ram) + " RAM"
+            displayValue = nameVal + " | " + sizeVal
+            choiceValue = inst.id + "::" + str(flavor.id)
+            instance_choices.append((choiceValue, displayValue))
+        except Exception as e:
+            logging.error("%s: Exception retrieving size information for"
+                          " instance: %s.  Exception is: %s", __method__,
+                          inst.name, e)
+            msg = ('Unable to retrieve size information for '
+                   'instance %s.' % inst.name)
+            exceptions.handle(request, msg)
 
     # If nothing ended up getting added to the list of choices
     if len(instance_choices) == 0:
@@ -286,8 +294,8 @@ def datastore_flavors(request, datastore_name, datastore_version):
     __method__ = 'forms.datastore_flavors'
     flavors = []
     try:
-        flavors = trove_api.trove.datastore_flavors(
-            request, datastore_name, datastore_version)
+        flavors = api_cache.call(request, 'datastore_flavors',
+                                 datastore_name, datastore_version)
     except Exception as e:
         logging.exception("%s: Exception while obtaining flavors list: %s",
                           __method__, e)
@@ -315,7 +323,7 @@ def retrieve_users(request, instance_id):
     __method__ = 'forms.retrieve_users'
     all_users = []
     try:
-        all_users = trove_api.trove.users_list(request, instance_id)
+        all_users = api_cache.call(request, 'users_list', instance_id)
     except Exception as e:
         # Retrieve the instance so we can display that information on our
         # error message -- so the user knows which instance is having
@@ -332,11 +340,33 @@ def retrieve_users(request, instance_id):
     return all_users
 
 
+def retrieve_for_instances(request, api_name, instances, item_type):
+    # Retrieve a list (users_list or database_list) for each of the
+    # instances passed in.  The calls are made concurrently; an instance
+    # whose list could not be retrieved in time is reported and returned
+    # with an error rather than holding up (or failing) the whole dialog.
+    # Returns a list of (instance, items, error) tuples.
+    __method__ = 'forms.retrieve_for_instances'
+    results = []
+    outcomes = api_cache.fan_out(request, api_name,
+                                 [instance.id for instance in instances])
+    for instance, (items, error) in zip(instances, outcomes):
+        if error is not None:
+            logging.error("%s: Exception retrieving %s for instance %s.  "
+                          "Error is: %s", __method__, item_type,
+                          instance.name, error)
+            msg = ('Unable to retrieve list of %(type)s for instance '
+                   '%(name)s.' % {'type': item_type, 'name': instance.name})
+            messages.error(request, msg)
+            items = []
+        results.append((instance, items, error))
+    return results
+
+
 def create_user_choices(request, instance_id=None, userName=None):
     # build a list of user choices for the instance passed in, and
     # then filter that list on a passed in userName
     user_choices = []
-    all_instances = []
 
     # Set initial value if needed
     if not userName:
@@ -344,17 +374,31 @@ def create_user_choices(request, instance_id=None, userName=None):
         user_choices.append((None, _("Select a user")))
 
     # Retrieve the instances (either the one identified by instance_id, or
-    # all instances
+    # all instances) and the users on each of them
     if instance_id:
-        # Retrieve the specific instance
-        all_instances.append(retrieve_instance(request, instance_id))
+        # Retrieve the specific instance (there are no users to choose
+        # from if it can't be retrieved)
+        instance = retrieve_instance(request, instance_id)
+        users_by_instance = []
+        if instance is not None:
+            users_by_instance = [(instance,
+                                  retrieve_users(request, instance.id),
+                                  None)]
     else:
-        # Retrieve all instances
+        # Retrieve all instances, and their users concurrently
         all_instances = retrieve_instances(request)
-
-    # all_instances may be empty if no instances have been defined.
-    for instance in all_instances:
-        all_users = retrieve_users(request, instance.id)
+        users_by_instance = retrieve_for_instances(request, 'users_list',
+                                                   all_instances, 'users')
+
+    # users_by_instance may be empty if no instances have been defined.
+    for instance, all_users, error in users_by_instance:
+        if error is not None:
+            # Users could not be retrieved for this instance -- show that
+            # in place of the instance's users.
+            displayValue = _("Users not available (instance: %s)") % \
+                instance.name
+            user_choices.append((None, displayValue))
+            continue
 
         for user in all_users:
             # value will be the instance id and the user name
@@ -406,7 +450,7 @@ def retrieve_databases(request, instance_id):
     __method__ = 'forms.retrieve_databases'
     all_databases = []
     try:
-        all_databases = trove_api.trove.database_list(request, instance_id)
+        all_databases = api_cache.call(request, 'database_list', instance_id)
     except Exception as e:
         # Retrieve the instance so we can display that information on our
         # error message -- so the user knows which instance is having
@@ -428,7 +472,6 @@ def create_database_choices(request, instance_id=None, databaseName=None):
     # build a list of database choices for the instance passed in, and
     # then filter that list on a passed in databaseName
     database_choices = []
-    all_instances = []
 
     if not databaseName:
         # Currently we only want the default ('Select a database')
@@ -440,15 +483,32 @@ def create_database_choices(request, instance_id=None, databaseName=None):
             database_choices.append((None, _("Select a database")))
 
     if (instance_id):
-        # Retrieve the specific instance
-        all_instances.append(retrieve_instance(request, instance_id))
+        # Retrieve the specific instance (there are no databases to choose
+        # from if it can't be retrieved)
+        instance = retrieve_instance(request, instance_id)
+        databases_by_instance = []
+        if instance is not None:
+            databases_by_instance = [(instance,
+                                      retrieve_databases(request,
+                                                         instance.id),
+                                      None)]
     else:
-        # Retrieve all instances
+        # Retrieve all instances, and their databases concurrently
         all_instances = retrieve_instances(request)
-
-    # all_instances may be empty of no instances have been defined.
-    for instance in all_instances:
-        all_databases = retrieve_databases(request, instance.id)
+        databases_by_instance = retrieve_for_instances(request,
+                                                       'database_list',
+                                                       all_instances,
+                                                       'databases')
+
+    # databases_by_instance may be empty of no instances have been defined.
+    for instance, all_databases, error in databases_by_instance:
+        if error is not None:
+            # Databases could not be retrieved for this instance -- show
+            # that in place of the instance's databases.
+            displayValue = _("Databases not available (instance: %s)") % \
+                instance.name
+            database_choices.append((None, displayValue))
+            continue
 
         for database in all_databases:
             # value will be the instance id and the database name
@@ -505,7 +565,7 @@ def retrieve_instance(request, instance_id):
 
     instance = None
     try:
-        instance = trove_api.trove.instance_get(request, instance_id)
+        instance = api_cache.call(request, 'instance_get', instance_id)
         return instance
     except Exception as e:
         logging.error("%s: Exception retrieving instance with ID: %s."
@@ -527,7 +587,7 @@ def retrieve_backup_name(request, backup_id):
 
     backup_name = backup_id
     try:
-        backup = trove_api.trove.backup_get(request, backup_id)
+        backup = api_cache.call(request, 'backup_get', backup_id)
         backup_name = backup.name
     except Exception as e:
         logging.error("%s: Exception retrieving backup with ID: %s."
@@ -546,7 +606,7 @@ def retrieve_datastores(request):
     __method__ = 'forms.retrieve_datastores'
     all_datastores = []
     try:
-        all_datastores = trove_api.trove.datastore_list(request)
+        all_datastores = api_cache.call(request, 'datastore_list')
     except Exception as e:
         logging.error("%s: Exception retrieving datastores: %s", __method__, e)
         msg = _('Unable to retrieve list of datastores.')
@@ -562,7 +622,7 @@ def retrieve_backups(request, allowed_states=None):
     all_backups = []
     allowed_backups = []
     try:
-        all_backups = trove_api.trove.backup_list(request)
+        all_backups = api_cache.call(request, 'backup_list')
     except Exception as e:
         logging.error("%s: Exception retrieving backups: %s", __method__, e)
         msg = _('Unable to retrieve list of backups.')
@@ -618,7 +678,7 @@ def create_backup_choices_for_instance(request, instanceID):
     backup_choices = [(None, _("No Parent Backup"))]
     backups = []
     try:
-        backups = trove_api.trove.instance_backups(request, instanceID)
+        backups = api_cache.call(request, 'instance_backups', instanceID)
     except Exception as e:
         logging.error("%s: Exception retrieving backups: %s", __method__, e)
         msg = _('Unable to retrieve list of backups for '
@@ -630,6 +690,167 @@ def create_backup_choices_for_instance(request, instanceID):
     return backup_choices
 
 
+def _matches(query, text):
+    # Case insensitive 'contains' match used by the choice searches
+    return not query or query.lower() in text.lower()
+
+
+def _page(matched, offset, limit):
+    # Return one page of matched choices, and whether more remain
+    return matched[offset:offset + limit], len(matched) > offset + limit
+
+
+def search_instance_choices(request, query=None, offset=0, limit=20,
+                            allowed_states=None):
+    # Return a page of instance choices whose name contains the query
+    matched = [(inst.id, inst.name)
+               for inst in retrieve_instances(request, allowed_states)
+               if _matches(query, inst.name)]
+    return _page(matched, offset, limit)
+
+
+def _search_instance_item_choices(request, api_name, query, offset, limit,
+                                  instance_id=None):
+    # Return a page of user or database choices (value instance id::name)
+    # whose display text contains the query.  Instances are visited a few
+    # at a time and the search stops as soon as it has enough matches for
+    # the page, so only what is displayed needs to be retrieved.
+    __method__ = 'forms._search_instance_item_choices'
+    if instance_id:
+        instance = retrieve_instance(request, instance_id)
+        instances = [instance] if instance is not None else []
+    else:
+        instances = retrieve_instances(request)
+
+    matched = []
+    chunk = max(1, api_cache.FANOUT_CONCURRENCY)
+    for start in range(0, len(instances), chunk):
+        batch = instances[start:start + chunk]
+        outcomes = api_cache.fan_out(request, api_name,
+                                     [inst.id for inst in batch])
+        for instance, (items, error) in zip(batch, outcomes):
+            if error is not None:
+                logging.error("%s: Exception calling %s for instance %s.  "
+                              "Error is: %s", __method__, api_name,
+                              instance.name, error)
+                continue
+            for item in items:
+                if instance_id:
+                    displayValue = item.name
+                else:
+                    displayValue = (item.name + " (instance: " +
+                                    instance.name + ')')
+                if _matches(query, displayValue):
+                    matched.append((instance.id + "::" + item.name,
+                                    displayValue))
+        if len(matched) > offset + limit:
+            break
+
+    return _page(matched, offset, limit)
+
+
+def search_user_choices(request, query=None, offset=0, limit=20,
+                        instance_id=None):
+    return _search_instance_item_choices(request, 'users_list', query,
+                                         offset, limit, instance_id)
+
+
+def search_database_choices(request, query=None, offset=0, limit=20,
+                            instance_id=None):
+    return _search_instance_item_choices(request, 'database_list', query,
+                                         offset, limit, instance_id)
+
+
+def search_backup_choices(request, query=None, offset=0, limit=20,
+                          instance_id=None):
+    # Return a page of the (parent) backup choices for an instance
+    matched = [choice for choice in
+               create_backup_choices_for_instance(request, instance_id)[1:]
+               if _matches(query, choice[1])]
+    choices, more = _page(matched, offset, limit)
+    if not offset:
+        # Selecting a parent backup is optional
+        choices.insert(0, ('', _("No Parent Backup")))
+    return choices, more
+
+
+# Choice searches available through the shortcuts 'choices' endpoint
+SEARCHES = {
+    'instances': search_instance_choices,
+    'users': search_user_choices,
+    'databases': search_database_choices,
+    'backups': search_backup_choices,
+}
+
+
+def set_choices_url(field, kind, **params):
+    # Point a picker field at the shortcuts 'choices' endpoint.  The
+    # picker fetches its choices from there a page at a time as the user
+    # types, so the dialog does not need to enumerate them up front.
+    url = reverse('horizon:dbaas_ui:shortcuts:choices', args=(kind,))
+    params = sorted((key, value) for key, value in params.items() if value)
+    if params:
+        url += '?' + urlencode(params)
+    field.widget.attrs['data-choices-url'] = url
+
+
+def _selected_value(form, field_name):
+    # Value submitted for a field (None when the form is not being posted)
+    if form.is_bound:
+        return form.data.get(field_name) or None
+    return None
+
+
+def _selected_element_and_value(form, field_name):
+    # Instance id and name submitted for a user or database field (None,
+    # None when not posted or not in the instance id::name form, which
+    # leaves the field to report the value as an invalid choice)
+    selected = _selected_value(form, field_name)
+    if not selected or '::' not in selected:
+        return None, None
+    element, element_value = parse_element_and_value_text(selected)
+    if not element or not element_value:
+        return None, None
+    return element, element_value
+
+
+def lazy_instance_choices(form, field_name, allowed_states=None):
+    # Choices for an instance picker used without an instance context.
+    # Only the submitted instance (if any) is needed to validate the form;
+    # everything else is searched for through the choices endpoint.  The
+    # submitted instance is only a choice while it is in one of the
+    # allowed states.
+    set_choices_url(form.fields[field_name], 'instances',
+                    status=','.join(allowed_states or ()))
+    selected = _selected_value(form, field_name)
+    if selected:
+        instance = retrieve_instance(form.request, selected)
+        if instance is not None and (not allowed_states or
+                                     instance.status in allowed_states):
+            return [(instance.id, instance.name)]
+    return [('', _("Select an instance"))]
+
+
+def lazy_user_choices(form, field_name):
+    # Choices for a user picker used without a user context
+    set_choices_url(form.fields[field_name], 'users')
+    instance_id, user_name = _selected_element_and_value(form, field_name)
+    if instance_id:
+        return create_user_choices(form.request, instance_id, user_name)
+    return [('', _("Select a user"))]
+
+
+def lazy_database_choices(form, field_name):
+    # Choices for a database picker used without a database context
+    set_choices_url(form.fields[field_name], 'databases')
+    instance_id, database_name = _selected_element_and_value(form,
+                                                             field_name)
+    if instance_id:
+        return create_database_choices(form.request, instance_id,
+                                       database_name)
+    return [('', _("Select a database"))]
+
+
 class RestartInstanceForm(forms.SelfHandlingForm):
     instance = forms.ChoiceField(
         label=_("Instance"),
@@ -648,7 +869,10 @@ class RestartInstanceForm(forms.SelfHandlingForm):
 
         # Restrict list of instances to those that can be restarted (statuses)
         sts = ("ACTIVE", "SHUTDOWN", "RESTART_REQUIRED")
-        choices = create_instance_choices(request, sts, instID)
+        if instID:
+            choices = create_instance_choices(request, sts, instID)
+        else:
+            choices = lazy_instance_choices(self, 'instance', sts)
 
         self.fields['instance'].choices = choices
 
@@ -710,7 +934,10 @@ class DeleteInstanceForm(forms.SelfHandlingForm):
 
         # Allow all instances to be deleted (There are no status restrictions)
         sts = None
-        choices = create_instance_choices(request, sts, instID)
+        if instID:
+            choices = create_instance_choices(request, sts, instID)
+        else:
+            choices = lazy_instance_choices(self, 'instance', sts)
 
         self.fields['instance'].choices = choices
 
@@ -751,6 +978,8 @@ class DeleteInstanceForm(forms.SelfHandlingForm):
             # Return true to close the dialog
             return True
 
+        api_cache.invalidate_instance(request, selected_instance)
+
         msg = ('Delete of instance %(instance_name)s started.'
                % {'instance_name': instance_name})
         messages.success(request, msg)
@@ -786,17 +1015,33 @@ class ResizeInstanceForm(forms.SelfHandlingForm):
             self.fields['instance'].initial = instID
             self.fields['instance'].widget.attrs['readonly'] = True
 
+        # Use the instances create_inst_fl_choices already retrieved (the
+        # list is cached for this request) rather than retrieving each
+        # instance again.
+        instances = dict((inst.id, inst)
+                         for inst in retrieve_instances(request, sts))
+
+        # Many instances share a datastore version -- only build the flavor
+        # choices once for each distinct datastore and version.
+        flavor_choices_by_version = {}
+
         for instance_choice in instance_choices:
             if instance_choice[0]:
                 instance_id, flavor_id = \
                     parse_element_and_value_text(instance_choice[0])
-                instance_obj = retrieve_instance(request, instance_id)
+                instance_obj = instances.get(instance_id)
+                if instance_obj is None:
+                    instance_obj = retrieve_instance(request, instance_id)
                 datastore = instance_obj.datastore['type']
                 datastore_version = instance_obj.datastore['version']
 
                 # Find the flavors for the datastore version
-                flavor_choices = create_flavor_choices(request, datastore,
-                                                       datastore_version)
+                version_key = (datastore, datastore_version)
+                if version_key not in flavor_choices_by_version:
+                    flavor_choices_by_version[version_key] = \
+                        create_flavor_choices(request, datastore,
+                                              datastore_version)
+                flavor_choices = flavor_choices_by_version[version_key]
 
                 # Define a db field for this instance
                 dataKey = 'data-instance-' + instance_choice[0]
@@ -992,9 +1237,9 @@ class UpgradeInstanceForm(forms.SelfHandlingForm):
             version_choices = []
             try:
                 # Retrieve the available datastore versions
-                ds_versions = trove_api.trove.datastore_version_list(
-                    request,
-                    inst.datastore['type'])
+                ds_versions = api_cache.call(request,
+                                             'datastore_version_list',
+                                             inst.datastore['type'])
             except Exception as e:
                 logging.error("%s: Exception received trying to retrieve "
                               "datastore versions for datastore %s. "
@@ -1092,13 +1337,35 @@ class CreateBackupForm(forms.SelfHandlingForm):
 
         # Restrict list of instances to those that can be backed up
         sts = ("ACTIVE",)
-        instances = create_instance_choices(request, sts, instID)
+        if instID:
+            instances = create_instance_choices(request, sts, instID)
+        else:
+            instances = lazy_instance_choices(self, 'instance', sts)
 
         self.fields['instance'].choices = instances
 
         if instID:
             self.fields['instance'].initial = instID
             self.fields['instance'].widget.attrs['readonly'] = True
+        else:
+            # The instance is picked through a search, so the parent
+            # backups can't be listed per instance up front -- a single
+            # field is loaded with the backups of the instance picked.
+            self.fields['parent_backup'] = forms.ChoiceField(
+                label=_("Parent Backup"),
+                required=False,
+                help_text=_("Optional parent backup"),
+                widget=forms.Select(attrs={
+                    'data-choices-depends-on': 'instance'}))
+            set_choices_url(self.fields['parent_backup'], 'backups')
+            selected = _selected_value(self, 'instance')
+            if selected:
+                self.fields['parent_backup'].choices = \
+                    create_backup_choices_for_instance(request, selected)
+            else:
+                self.fields['parent_backup'].choices = \
+                    [('', _("No Parent Backup"))]
+            return
 
         for instance in instances:
             if instance[0]:
@@ -1133,7 +1400,10 @@ class CreateBackupForm(forms.SelfHandlingForm):
         # Need the instance name in both success/failure cases.
         # Retrieve it now (will be instance_id if we couldn't retrieve it).
         instance_name = retrieve_instance(request, selected_instance).name
-        parent_backup = data[selected_instance]
+        if selected_instance in data:
+            parent_backup = data[selected_instance]
+        else:
+            parent_backup = data.get('parent_backup') or None
 
         # Perform the backup attempt
         try:
@@ -1180,7 +1450,10 @@ class RenameInstanceForm(forms.SelfHandlingForm):
 
         # Allow all instances to be renamed
         sts = None
-        choices = create_instance_choices(request, sts, instID)
+        if instID:
+            choices = create_instance_choices(request, sts, instID)
+        else:
+            choices = lazy_instance_choices(self, 'instance', sts)
 
         self.fields['instance'].choices = choices
 
@@ -1222,6 +1495,8 @@ class RenameInstanceForm(forms.SelfHandlingForm):
             # Return true to close the dialog
             return True
 
+        api_cache.invalidate_instance(request, sel_inst)
+
         msg = ('Instance %(instance_name)s was renamed to %(new_name)s.'
                % {'instance_name': instance_name, 'new_name': new_name})
 
@@ -1483,11 +1758,11 @@ class DeleteUserForm(forms.SelfHandlingForm):
                                                   instance_id,
                                                   user_name)
                 else:
-                    choices = create_user_choices(request, None, None)
+                    choices = lazy_user_choices(self, 'user')
             else:
-                choices = create_user_choices(request, None, None)
+                choices = lazy_user_choices(self, 'user')
         else:
-            choices = create_user_choices(request, None, None)
+            choices = lazy_user_choices(self, 'user')
 
         self.fields['user'].choices = choices
 
@@ -1660,11 +1935,11 @@ class DeleteDatabaseForm(forms.SelfHandlingForm):
                                                       instance_id,
                                                       database_name)
                 else:
-                    choices = create_database_choices(request, None, None)
+                    choices = lazy_database_choices(self, 'database')
             else:
-                choices = create_database_choices(request, None, None)
+                choices = lazy_database_choices(self, 'database')
         else:
-            choices = create_database_choices(request, None, None)
+            choices = lazy_database_choices(self, 'database')
 
         self.fields['database'].choices = choices
 
@@ -1724,7 +1999,7 @@ class ManageRootNoContextForm(forms.SelfHandlingForm):
         # Restrict list of instances to those on which the root user can be
         # enabled.
         sts = ("ACTIVE",)
-        choices = create_instance_choices(request, sts)
+        choices = lazy_instance_choices(self, 'instance', sts)
 
         self.fields['instance'].choices = choices
 
@@ -1761,8 +2036,9 @@ class ManageUserNoContextForm(forms.SelfHandlingForm):
     def __init__(self, request, *args, **kwargs):
         super(ManageUserNoContextForm, self).__init__(request, *args, **kwargs)
 
-        # Retireve all users for all instances
-        choices = create_user_choices(request, None, None)
+        # Users are searched for as the user types rather than retrieving
+        # all users for all instances
+        choices = lazy_user_choices(self, 'user')
 
         self.fields['user'].choices = choices
 
@@ -21,6 +21,10 @@ urlpatterns = patterns(
     # Index provides main page
     url(r'^$', views.IndexView.as_view(), name='index'),
 
+    # Paged, filterable choices for the dialogs' pickers
+    url(r'^choices/(?P<kind>[^/]+)/$',
+        views.ChoicesView.as_view(), name='choices'),
+
     url(r'^launch_instance',
         views.LaunchInstanceView.as_view(), name='launch_instance'),
 
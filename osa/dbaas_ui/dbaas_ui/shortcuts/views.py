@@ -13,7 +13,10 @@
 # limitations under the License.
 from django.core.urlresolvers import reverse
 from django.core.urlresolvers import reverse_lazy
+from django import http
+from django.utils.encoding import force_text
 from django.utils.translation import ugettext_lazy as _
+from django.views import generic
 
 from horizon import exceptions
 from horizon import forms
@@ -57,6 +60,53 @@ class IndexView(baseTabs.TabView):
     page_title = _("Shortcuts")
 
 
+# Largest page of choices the choices endpoint will return
+MAX_CHOICES_PAGE = 100
+
+
+class ChoicesView(generic.View):
+    # Returns one page of choices for a picker (instances, users, databases
+    # or parent backups) as JSON.  The shortcuts dialogs use this to fill
+    # their pickers as the user types instead of building every choice on
+    # the server before the dialog is shown.
+    #
+    # Query parameters:
+    #   q           - only return choices whose text contains this value
+    #   offset      - index of the first choice to return (default 0)
+    #   limit       - number of choices to return (default 20)
+    #   status      - comma separated instance statuses (instances only)
+    #   instance_id - restrict users/databases/backups to one instance
+    def get(self, request, kind):
+        search = project_forms.SEARCHES.get(kind)
+        if search is None:
+            raise http.Http404
+
+        try:
+            offset = max(0, int(request.GET.get('offset', 0)))
+            limit = min(MAX_CHOICES_PAGE,
+                        max(1, int(request.GET.get('limit', 20))))
+        except ValueError:
+            return http.HttpResponseBadRequest()
+
+        params = {'query': request.GET.get('q', '').strip(),
+                  'offset': offset,
+                  'limit': limit}
+        if kind == 'instances':
+            status = request.GET.get('status')
+            params['allowed_states'] = status.split(',') if status else None
+        else:
+            params['instance_id'] = request.GET.get('instance_id') or None
+            if kind == 'backups' and not params['instance_id']:
+                return http.JsonResponse({'choices': [], 'more': False})
+
+        choices, more = search(request, **params)
+        return http.JsonResponse({
+            'choices': [('' if value is None else value, force_text(label))
+                        for value, label in choices],
+            'more': more,
+            'offset': offset + len(choices)})
+
+
 # Views for all actions that shortcuts, instances and backups call
 class LaunchInstanceView(horizon_workflows.WorkflowView):
     workflow_class = aggregate_workflows.LaunchInstance
@@ -20,6 +20,7 @@ from django.utils.translation import ugettext_lazy as _
 
 from horizon import exceptions
 from horizon import forms
+from horizon import messages
 from horizon.utils import memoized
 from horizon import workflows
 from openstack_dashboard import api as dash_api
@@ -32,6 +33,7 @@ from openstack_dashboard.api.glance import glanceclient as glance_client
 
 from trove_dashboard import api as trove_api
 
+from dbaas_ui.shortcuts import api_cache
 
 LOG = logging.getLogger(__name__)
 
@@ -122,18 +124,6 @@ class SetInstanceDetailsAction(workflows.Action):
             zone_list.insert(0, ("", _("Any Availability Zone")))
         return zone_list
 
-    @memoized.memoized_method
-    def datastore_flavors(self, request, datastore_name, datastore_version):
-        try:
-            return trove_api.trove.datastore_flavors(
-                request, datastore_name, datastore_version)
-        except Exception:
-            LOG.exception("Exception while obtaining flavors list")
-            redirect = reverse("horizon:dbaas_ui:index")
-            exceptions.handle(request,
-                              _('Unable to obtain flavors.'),
-                              redirect=redirect)
-
     @memoized.memoized_method
     def datastores(self, request):
         try:
@@ -142,30 +132,87 @@ class SetInstanceDetailsAction(workflows.Action):
             LOG.exception("Exception while obtaining datastores list")
             self._datastores = []
 
-    @memoized.memoized_method
-    def datastore_versions(self, request, datastore):
-        try:
-            return trove_api.trove.datastore_version_list(request, datastore)
-        except Exception:
-            LOG.exception("Exception while obtaining datastore version list")
-            self._datastore_versions = []
-
     def glance_image_ids(self, request):
         try:
-            image_ids = []
-            image_iter = glance_client(request).images.list()
-            for image in image_iter:
-                image_ids.append(image.id)
-            return image_ids
+            return frozenset(image.id for image in
+                             glance_client(request).images.list())
         except Exception:
             LOG.exception("Exception while obtaining glance image list")
 
+    @memoized.memoized_method
+    def datastore_catalog(self, request):
+        # Returns a dict holding the datastores, the versions of each
+        # datastore (keyed by datastore name), the flavors of each active
+        # version (keyed by (datastore name, version name)) and the set of
+        # Glance image ids (None if they could not be retrieved).  The
+        # catalog is shared across requests for api_cache.CATALOG_CACHE_TTL
+        # seconds, unless some part of it could not be retrieved.
+        catalog = api_cache.catalog_cache.get(request.user.project_id)
+        if catalog is None:
+            catalog, complete = self._discover_datastore_catalog(request)
+            if complete:
+                api_cache.catalog_cache.set(request.user.project_id, catalog)
+        return catalog
+
+    def _discover_datastore_catalog(self, request):
+        # Glance is listed in the background while the datastores, then the
+        # versions of all datastores, then the flavors of all versions, are
+        # retrieved (each level with concurrent calls).
+        complete = True
+        images = api_cache.submit(self.glance_image_ids, request)
+        try:
+            datastores = self.datastores(request)
+            if datastores is None:
+                complete = False
+            names = [ds.name for ds in datastores or []]
+
+            versions = {}
+            outcomes = api_cache.fan_out(request, 'datastore_version_list',
+                                         names)
+            for name, (result, error) in zip(names, outcomes):
+                if error is not None:
+                    LOG.error("Exception while obtaining datastore version "
+                              "list for datastore %s: %s", name, error)
+                    complete = False
+                versions[name] = result or []
+
+            keys = [(name, v.name) for name in names for v in versions[name]
+                    if getattr(v, 'active', True)]
+            flavors = {}
+            for key, (result, error) in zip(
+                    keys, api_cache.fan_out(request, 'datastore_flavors',
+                                            keys)):
+                if error is not None:
+                    LOG.error("Exception while obtaining flavors list for "
+                              "datastore %s version %s: %s",
+                              key[0], key[1], error)
+                    messages.error(request, _('Unable to obtain flavors.'))
+                    raise exceptions.Http302(
+                        reverse("horizon:dbaas_ui:index"))
+                flavors[key] = result
+
+            image_ids, error = images.outcome()
+            if error is not None:
+                LOG.error("Exception while obtaining glance image list: %s",
+                          error)
+            if image_ids is None:
+                complete = False
+        finally:
+            # Gives the pool back if the flavors could not be obtained
+            images.close()
+
+        catalog = {'datastores': datastores or [],
+                   'versions': versions,
+                   'flavors': flavors,
+                   'image_ids': image_ids}
+        return catalog, complete
+
     def populate_datastore_choices(self, request, context):
         choices = ()
-        datastores = self.datastores(request)
-        image_ids = self.glance_image_ids(request)
-        for ds in datastores or []:
-            versions = self.datastore_versions(request, ds.name)
+        catalog = self.datastore_catalog(request)
+        image_ids = catalog['image_ids']
+        for ds in catalog['datastores']:
+            versions = catalog['versions'].get(ds.name)
             if versions:
                 # only add to choices if datastore has at least one version
                 version_choices = ()
@@ -174,7 +221,10 @@ class SetInstanceDetailsAction(workflows.Action):
                         LOG.error("Invalid datastore (%s) and version (%s)"
                                   ". Version is not active.", ds.name, v.name)
                         continue
-                    if hasattr(v, 'image') and v.image not in image_ids:
+                    # Without the Glance image ids the check is left to
+                    # Trove when the instance is launched
+                    if (image_ids is not None and hasattr(v, 'image') and
+                            v.image not in image_ids):
                         LOG.error("Invalid datastore (%s) and version (%s)"
                                   ". Version does not have an image "
                                   "associated with it", ds.name, v.name)
@@ -185,14 +235,17 @@ class SetInstanceDetailsAction(workflows.Action):
                                                                 v.name)
                     version_choices = (version_choices +
                                        ((widget_text, selection_text),))
-                    self._add_datastore_flavor_field(request, ds.name, v.name)
+                    self._add_datastore_flavor_field(
+                        request, ds.name, v.name,
+                        catalog['flavors'].get((ds.name, v.name)))
                 choices = choices + version_choices
         return choices
 
     def _add_datastore_flavor_field(self,
                                     request,
                                     datastore,
-                                    datastore_version):
+                                    datastore_version,
+                                    valid_flavors):
         name = self._build_widget_field_name(datastore, datastore_version)
         attr_key = 'data-datastore-' + name
         field_name = self._build_flavor_field_name(datastore,
@@ -206,9 +259,6 @@ class SetInstanceDetailsAction(workflows.Action):
                 'data-switch-on': 'datastore',
                 attr_key: _("Flavor")
             }))
-        valid_flavors = self.datastore_flavors(request,
-                                               datastore,
-                                               datastore_version)
         if valid_flavors:
             self.fields[field_name].choices = instance_utils.sort_flavor_list(
                 request, valid_flavors)
@@ -372,6 +422,9 @@ class LaunchInstance(workflows.Workflow):
                                             availability_zone=avail_zone)
             return True
         except Exception:
+            # The launch may have failed because the datastore catalog the
+            # form was built from is out of date
+            api_cache.invalidate_catalog(request)
             exceptions.handle(request)
             return False
 
@@ -18,13 +18,91 @@
 
 
 import argparse
-import copy
+import contextlib
+import fcntl
+import json
+import os
 import signal
 import sys
+import tempfile
 import yaml
 
+# The genesis inventory loader is shared with the OSA scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..', '..', '..', '..', 'scripts'))
+import inventory_loader
+
 
 NODENAME_FIELD = 'ipv4-pxe'
+DL_TYPES = ('account', 'container', 'object')
+
+
+@contextlib.contextmanager
+def inventory_lock(filename):
+    """Hold an exclusive advisory lock on an inventory file.
+
+    The lock is taken on a separate lock file (.<name>.lock), since the
+    inventory itself is replaced when it is written. Inventory updates
+    read the inventory while holding the lock, so concurrent updates of
+    the same file are applied one after another and none are lost.
+    """
+    dirname, basename = os.path.split(filename)
+    lock_name = os.path.join(dirname, '.' + basename + '.lock')
+    with open(lock_name, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def build_node_index(inventory):
+    """Map the nodename (NODENAME_FIELD) of each inventory node to the node.
+
+    Each nodename maps to a (node template name, position in the template's
+    node list, node) tuple. Where several nodes have the same nodename the
+    first one wins, as it would in a scan of the nodes.
+    """
+    index = {}
+    for template_name, nodes in (inventory.get('nodes') or {}).iteritems():
+        for position, node in enumerate(nodes or []):
+            index.setdefault(node.get(NODENAME_FIELD),
+                             (template_name, position, node))
+    return index
+
+
+def json_pointer(*keys):
+    """Return the JSON pointer (RFC 6901) of the given inventory keys."""
+    return ''.join('/' + str(key).replace('~', '~0').replace('/', '~1')
+                   for key in keys)
+
+
+def read_manifest(filename):
+    """Read the disk lists from a disk prep manifest.
+
+    The manifest, written by the swift storage setup script on a host,
+    lists one disk per line as a JSON object with (among others) the
+    ring the disk is used for and its label.
+
+    :returns: A dict of disk list type to the list of labels, in the
+              order they are listed.
+    """
+    disk_lists = {}
+    with open(filename, 'r') as stream:
+        for line in stream:
+            if line.strip():
+                entry = json.loads(line)
+                # Labels are plain strings in the inventory (not unicode)
+                disk_lists.setdefault(entry['ring'], []).append(
+                    str(entry['label']))
+    return disk_lists
+
+
+def write_patch(filename, patch):
+    """Write a list of JSON patch (RFC 6902) operations to a file."""
+    with open(filename, 'w') as stream:
+        json.dump(patch, stream, indent=4, sort_keys=True)
+        stream.write('\n')
 
 
 class SwiftDiskPrep(object):
@@ -52,17 +130,43 @@ class SwiftDiskPrep(object):
         self.input_dict = {}
         self.output_dict = {}
 
-    def _load_yml(self, name):
+        # The changes made to the inventory, as JSON patch (RFC 6902)
+        # operations against the input inventory.
+        self.patch = []
+
+    @staticmethod
+    def _load_yml(name):
         with open(name, 'r') as stream:
             try:
-                return yaml.safe_load(stream)
+                return inventory_loader.load(stream)
             except yaml.YAMLError as ex:
                 print(ex)
             sys.exit(1)
 
-    def _write_yml(self, filename, contents):
-        stream = file(filename, 'w')
-        yaml.dump(contents, stream, indent=4, default_flow_style=False)
+    @staticmethod
+    def _write_yml(filename, contents):
+        # Write to a temporary file and rename it over the inventory, so
+        # readers see either the old or the new inventory, never a partly
+        # written one.
+        dirname, basename = os.path.split(os.path.abspath(filename))
+        try:
+            mode = os.stat(filename).st_mode & 0o7777
+        except OSError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        fd, tmp_name = tempfile.mkstemp(dir=dirname, prefix='.' + basename)
+        try:
+            with os.fdopen(fd, 'w') as stream:
+                yaml.dump(contents, stream, indent=4,
+                          default_flow_style=False)
+                stream.flush()
+                os.fsync(stream.fileno())
+            os.chmod(tmp_name, mode)
+            os.rename(tmp_name, filename)
+        except Exception:
+            os.remove(tmp_name)
+            raise
 
     def _read_dl_file(self):
         with open(self.dl_file, 'r') as fp:
@@ -70,36 +174,117 @@ class SwiftDiskPrep(object):
                 stripline = line.strip()
                 self.dl.append(stripline)
 
-    def _add_dl_to_inventory(self):
-        self.output_dict = copy.deepcopy(self.input_dict)
+    def _add_dl_to_inventory(self, node_index=None):
+        # The inventory is updated in place (the output is the input): only
+        # the target host changes, so copying the whole inventory is not
+        # needed.  The loaded inventory is not shared with anything else.
+        if node_index is None:
+            node_index = build_node_index(self.input_dict)
+        self.output_dict = self.input_dict
+        self._update_host(node_index.get(self.nodename))
 
-        target_host = {}
-        # Flatten the nodes from the inventory into a single list
-        nodes = [node for sublist in self.output_dict['nodes'].values()
-                 for node in sublist]
-
-        for host in nodes:
-            if self.nodename == host[NODENAME_FIELD]:
-                target_host = host
-                break
-
-        if target_host:
-            if 'domain-settings' not in target_host:
-                target_host['domain-settings'] = {}
-            target_host['domain-settings'][self.dl_type_string] = self.dl
-        else:
+    def _update_host(self, location):
+        if not location:
             print ("Error: Host %s not found.\n" % (self.nodename))
             sys.exit(1)
 
+        template_name, position, target_host = location
+        host_path = ('nodes', template_name, position)
+        if 'domain-settings' not in target_host:
+            target_host['domain-settings'] = {self.dl_type_string: self.dl}
+            self.patch.append({
+                'op': 'add',
+                'path': json_pointer(*host_path + ('domain-settings',)),
+                'value': {self.dl_type_string: self.dl}})
+            return
+
+        domain_settings = target_host['domain-settings']
+        if domain_settings.get(self.dl_type_string) == self.dl:
+            return
+        op = 'replace' if self.dl_type_string in domain_settings else 'add'
+        domain_settings[self.dl_type_string] = self.dl
+        self.patch.append({
+            'op': op,
+            'path': json_pointer(*host_path + ('domain-settings',
+                                               self.dl_type_string)),
+            'value': self.dl})
+
 
 def process_disklist(args):
     sdp = SwiftDiskPrep(args.nodename, args.input_file, args.output_file,
                         args.disklist_file, args.disklist_type)
 
-    sdp.input_dict = sdp._load_yml(sdp.input_file)
     sdp._read_dl_file()
-    sdp._add_dl_to_inventory()
-    sdp._write_yml(sdp.output_file, sdp.output_dict)
+    with inventory_lock(sdp.output_file):
+        sdp.input_dict = sdp._load_yml(sdp.input_file)
+        sdp._add_dl_to_inventory()
+        sdp._write_yml(sdp.output_file, sdp.output_dict)
+    if args.patch_file:
+        write_patch(args.patch_file, sdp.patch)
+
+
+def process_batch(input_file, output_file, updates, patch_file=None,
+                  manifests=()):
+    """Add the disk lists of many hosts to the inventory in one pass.
+
+    The inventory is loaded, indexed by nodename and written once, rather
+    than once per host and disk list type.
+
+    :param input_file: Name of a genesis inventory (YAML) file.
+    :param output_file: Output modified genesis inventory (YAML) file.
+    :param updates: A list of (nodename, disk list type, disk list file).
+    :param patch_file: Name of a file to write the changes made to, as a
+                       JSON patch against the input inventory.
+    :param manifests: A list of (nodename, disk prep manifest file); the
+                      disk lists of each manifest are added to the node.
+    """
+    disk_preps = []
+    for nodename, dl_type, dl_file in updates:
+        sdp = SwiftDiskPrep(nodename, input_file, output_file, dl_file,
+                            dl_type)
+        sdp._read_dl_file()
+        disk_preps.append(sdp)
+    for nodename, manifest in manifests:
+        disk_lists = read_manifest(manifest)
+        for dl_type in DL_TYPES:
+            if dl_type in disk_lists:
+                sdp = SwiftDiskPrep(nodename, input_file, output_file,
+                                    manifest, dl_type)
+                sdp.dl = disk_lists[dl_type]
+                disk_preps.append(sdp)
+
+    with inventory_lock(output_file):
+        inventory = SwiftDiskPrep._load_yml(input_file)
+        node_index = build_node_index(inventory)
+        for sdp in disk_preps:
+            sdp._update_host(node_index.get(sdp.nodename))
+        SwiftDiskPrep._write_yml(output_file, inventory)
+    if patch_file:
+        write_patch(patch_file, [op for sdp in disk_preps for op in sdp.patch])
+
+
+def parse_update(value):
+    """Parse a batch update argument (<nodename>:<type>:<disk list file>)."""
+    try:
+        nodename, dl_type, dl_file = value.split(':', 2)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            '%s is not in the form <nodename>:<type>:<file>' % value)
+    if dl_type not in DL_TYPES:
+        raise argparse.ArgumentTypeError(
+            'The disk list type of %s is not one of %s' %
+            (value, ', '.join(DL_TYPES)))
+    return nodename, dl_type, dl_file
+
+
+def parse_manifest(value):
+    """Parse a manifest argument (<nodename>:<disk prep manifest file>)."""
+    try:
+        nodename, manifest = value.split(':', 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            '%s is not in the form <nodename>:<file>' % value)
+    return nodename, manifest
 
 
 def parse_command():
@@ -107,19 +292,37 @@ def parse_command():
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
         description=('A command to add swift account, container, and '
-                     'object disk lists to the Genesis inventory file.'))
-    parser.add_argument('-n', '--nodename', required=True,
+                     'object disk lists to the Genesis inventory file.\n\n'
+                     'Either update one host with -n, -d and -t, or update '
+                     'any number of\nhosts in one pass with -u and -m.'))
+    parser.add_argument('-n', '--nodename',
                         help=('Name of host in the Genesis inventory YAML'
                               'file.'))
     parser.add_argument('-i', '--input-file', required=True,
                         help=('Path to the Genesis inventory YAML file.'))
-    parser.add_argument('-d', '--disklist-file', required=True,
+    parser.add_argument('-d', '--disklist-file',
                         help=('Path to the disk list file (flat, non-YAML).'))
-    parser.add_argument('-t', '--disklist-type', required=True,
+    parser.add_argument('-t', '--disklist-type',
                         help=('<account | container | object>.'))
+    parser.add_argument('-u', '--update', dest='updates', action='append',
+                        type=parse_update, default=[],
+                        help=('A disk list to add, as '
+                              '<nodename>:<type>:<disk list file>.\n'
+                              'May be given many times; the inventory is '
+                              'read and written once.'))
+    parser.add_argument('-m', '--manifest', dest='manifests',
+                        action='append', type=parse_manifest, default=[],
+                        help=('A disk prep manifest of a host, as '
+                              '<nodename>:<manifest file>.\nEach of the '
+                              'disk lists in the manifest is added, as with '
+                              '-u.'))
     parser.add_argument('-o', '--output-file', default='output.inventory.yml',
                         help=('Path to the updated Genesis inventory YAML'
                               'file to be generated.'))
+    parser.add_argument('-p', '--patch-file',
+                        help=('Path to a file to write the changes made to '
+                              'the inventory to, as a\nJSON patch (RFC 6902) '
+                              'against the input inventory.'))
 
     return parser
 
@@ -139,7 +342,17 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    if args.disklist_type not in ('account', 'container', 'object'):
+    if args.nodename is None:
+        # Batch mode; with no updates the inventory is written unchanged
+        if args.disklist_file or args.disklist_type:
+            parser.print_help()
+            sys.exit(1)
+        process_batch(args.input_file, args.output_file, args.updates,
+                      args.patch_file, args.manifests)
+        return 0
+
+    if (args.updates or args.manifests or not args.disklist_file or
+            args.disklist_type not in DL_TYPES):
         parser.print_help()
         sys.exit(1)
 
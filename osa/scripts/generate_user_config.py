@@ -15,12 +15,19 @@
 # limitations under the License.
 
 import argparse
+import collections
 import copy
+import hashlib
+import json
 import os
 import signal
 import sys
+import tempfile
+import time
 import yaml
-import netaddr
+
+import inventory_loader
+import network_index
 
 OSA_USER_CFG_FILE = 'openstack_user_config.yml'
 OSA_USER_VAR_HAPROXY = 'user_var_haproxy.yml'
@@ -34,6 +41,10 @@ OSA_USER_VAR_CEPH = 'user_var_ceph.yml'
 # and containers once the deployment is completed.
 OSA_USER_VAR_DEPLOY_ENV = 'user_var_deploy_env.yml'
 
+# Fingerprints of the inventory sections each generated file was built
+# from, kept in the output directory by --incremental runs.
+FINGERPRINTS_FILE = '.generate_user_config.fingerprints'
+
 SWIFT_MINIMUM_HARDWARE = 'swift-minimum-hardware'
 SWIFT = 'swift'
 PRIVATE_COMPUTE_CLOUD = 'private-compute-cloud'
@@ -52,37 +63,168 @@ COMPUTE_HOSTS = 'compute_hosts'
 SWIFT_PROXY_HOSTS = 'swift-proxy_hosts'
 SWIFT_HOSTS = 'swift_hosts'
 
+# Use the libyaml based dumper when PyYAML was built with it.
+_BaseDumper = getattr(yaml, 'CDumper', yaml.Dumper)
+
+
+class _Dumper(_BaseDumper):
+    """Dumper which never emits anchors and aliases.
+
+    Host entries are shared between the host groups of the user config
+    rather than copied, so the files must be written out as if each
+    occurrence were a separate copy.
+    """
+
+    def ignore_aliases(self, data):
+        return True
+
 
 class OSAFileGenerator(object):
     """Class for generating various OSA configuration files."""
 
-    def __init__(self, inventory_name, output_dir):
+    def __init__(self, inventory_name, output_dir, incremental=False):
         """Initializer.
 
         :param inventory_name: Name of a genesis inventory file.
         :param output_dir: Directory to which files will be generated.
+        :param incremental: Only regenerate the files whose inputs changed
+                            since the last incremental run.
         """
         super(OSAFileGenerator, self).__init__()
         self.inventory_name = inventory_name
         self.output_dir = output_dir
+        self.incremental = incremental
         self.gen_dict = {}
         self.user_config = {}
+        # Input fingerprints from the last incremental run and this one,
+        # and the files written by this run
+        self.old_fingerprints = {}
+        self.fingerprints = {}
+        self.touched_files = []
+        # role -> nodes index and the gen_dict it was built from
+        self._role_index = None
+        self._role_index_source = None
+        # address -> network index and the networks it was built from
+        self._network_index = None
 
     def _load_yml(self):
         with open(self.inventory_name, 'r') as stream:
             try:
-                self.gen_dict = yaml.safe_load(stream)
+                self.gen_dict = inventory_loader.load(stream)
             except yaml.YAMLError:
                 raise
+        self._build_role_index()
 
     def _dump_yml(self, data, fname):
-        fname = os.path.join(self.output_dir, fname)
-        with open(fname, 'w') as stream:
+        if self.incremental:
+            self._dump_yml_atomic(data, fname)
+            return
+
+        path = os.path.join(self.output_dir, fname)
+        with open(path, 'w') as stream:
             try:
-                yaml.dump(data, stream, explicit_start=True,
+                yaml.dump(data, stream, Dumper=_Dumper, explicit_start=True,
                           default_flow_style=False)
             except yaml.YAMLError:
                 raise
+        self.touched_files.append(fname)
+
+    def _dump_yml_atomic(self, data, fname):
+        """Write the file to a temporary file which is then renamed over
+           it, so readers never see a partially written file.
+        """
+        path = os.path.join(self.output_dir, fname)
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir or '.',
+                                        prefix='.' + fname + '.')
+        try:
+            with os.fdopen(fd, 'w') as stream:
+                yaml.dump(data, stream, Dumper=_Dumper, explicit_start=True,
+                          default_flow_style=False)
+            if os.path.exists(path):
+                # Keep the mode of the file being replaced
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+            else:
+                os.chmod(tmp_path, 0o644)
+            os.rename(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        self.touched_files.append(fname)
+
+    def _get_output_inputs(self, fname):
+        """Return the parts of the inventory the given file is generated
+           from.  Only the nodes of the roles a file uses are included, so
+           adding, say, a ceph-osd node does not regenerate the files which
+           don't use them.
+        """
+        inputs = [self.get_ref_arch(),
+                  self.gen_dict.get('networks', None),
+                  self.gen_dict.get('internal-floating-ipaddr', None),
+                  self.gen_dict.get('external-floating-ipaddr', None)]
+        if fname == OSA_USER_CFG_FILE:
+            inputs.append(self.gen_dict.get('node-templates', None))
+            inputs.append(self._get_controllers())
+            for role in ('compute', 'swift-proxy', 'swift-object',
+                         'swift-metadata'):
+                inputs.append(self._get_nodes_for_role(role))
+        elif fname == OSA_USER_VAR_HAPROXY:
+            # Reference architecture and networks only
+            pass
+        elif fname == OSA_USER_VAR_CEPH:
+            inputs.append(self._get_ceph_monitors())
+        elif fname == OSA_USER_VAR_DEPLOY_ENV:
+            inputs.append(self.gen_dict.get('deployment-environment', None))
+            # for the load balancer addresses added to no_proxy
+            inputs.append(self._get_controllers())
+        else:
+            # Files which are not generated from the inventory
+            inputs = []
+        return inputs
+
+    def _get_fingerprint(self, fname):
+        data = json.dumps(self._get_output_inputs(fname), sort_keys=True,
+                          default=str)
+        return hashlib.sha1(data).hexdigest()
+
+    def _needs_update(self, fname):
+        """Check whether the given file is to be (re)generated.
+
+        Always true unless running incrementally, in which case it is only
+        true when the file's inputs changed since the last run (or the file
+        is missing).
+        """
+        if not self.incremental:
+            return True
+
+        fingerprint = self._get_fingerprint(fname)
+        self.fingerprints[fname] = fingerprint
+        path = os.path.join(self.output_dir, fname)
+        return (self.old_fingerprints.get(fname) != fingerprint or
+                not os.path.exists(path))
+
+    def load_fingerprints(self):
+        """Load the fingerprints saved by the last incremental run."""
+        path = os.path.join(self.output_dir, FINGERPRINTS_FILE)
+        try:
+            with open(path, 'r') as stream:
+                self.old_fingerprints = json.load(stream)
+        except (IOError, ValueError):
+            self.old_fingerprints = {}
+
+    def save_fingerprints(self):
+        """Save the fingerprints of this run for the next incremental run."""
+        fingerprints = dict(self.old_fingerprints)
+        fingerprints.update(self.fingerprints)
+        path = os.path.join(self.output_dir, FINGERPRINTS_FILE)
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir or '.',
+                                        prefix=FINGERPRINTS_FILE + '.')
+        try:
+            with os.fdopen(fd, 'w') as stream:
+                json.dump(fingerprints, stream, sort_keys=True, indent=2)
+            os.rename(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
 
     def _configure_cidr_networks(self):
         """Configure the CIDR networks."""
@@ -117,51 +259,83 @@ class OSAFileGenerator(object):
 
         return False
 
+    @staticmethod
+    def _node_key(node):
+        """ Key used to recognize a node listed more than once: its
+            hostname, or the node itself when it has no hostname.
+        """
+        if isinstance(node, dict):
+            hostname = node.get('hostname', None)
+            if hostname:
+                return 'hostname', hostname
+            return 'id', id(node)
+        return 'node', node
+
+    @classmethod
+    def _merge_nodes(cls, *node_lists):
+        """ Concatenate the given lists of nodes, dropping any node already
+            seen (by hostname) in an earlier list or earlier in its list.
+        """
+        seen = set()
+        merged = []
+        for nodes in node_lists:
+            for node in nodes:
+                key = cls._node_key(node)
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(node)
+        return merged
+
+    def _build_role_index(self):
+        """ Build the role -> nodes index in a single pass over the
+            node-templates. The nodes of each role are listed in
+            node-template order, without duplicates.
+        """
+        by_role = {}
+        node_templates = self.gen_dict.get('node-templates', None)
+        nodes = self.gen_dict.get('nodes', None)
+        if node_templates and nodes:
+            for host_type, template in node_templates.iteritems():
+                roles = template.get('roles', [])
+                if isinstance(roles, basestring):
+                    roles = [roles]
+                for role in set(roles):
+                    by_role.setdefault(role, []).append(
+                        nodes.get(host_type, []))
+
+        self._role_index = dict((role, self._merge_nodes(*node_lists))
+                                for role, node_lists in by_role.iteritems())
+        self._role_index_source = self.gen_dict
+
+    def _get_role_index(self):
+        # The index is rebuilt if gen_dict has been replaced since it was
+        # built (callers may set gen_dict directly instead of loading it).
+        if (self._role_index is None or
+                self._role_index_source is not self.gen_dict):
+            self._build_role_index()
+        return self._role_index
+
     def _get_nodes_through_roles(self, role):
-        """ Go through all node-templates and get all the host types which
-            have the given role. This method looks at roles only. It
+        """ Get the nodes of all host types (node-templates) which have
+            the given role. This method looks at roles only. It
             doesn't look for sections like "controllers", "computes", etc
             under nodes unless "controllers" or "compute" node-template has
             controller/compute role defined.
         """
-        hosts = []  # hosts of given role
-
-        # Find the node-templates section.
-        node_templates = self.gen_dict.get('node-templates', None)
-        nodes = self.gen_dict.get('nodes', None)
-        if not node_templates or not nodes:
-            return hosts
-
-        # Go through all the node-templates and look for the given role
-        for host_type, template in node_templates.iteritems():
-            if self.is_host_type_of_role(role, template):
-                # Add nodes of this host type to hosts list
-                hosts.extend(nodes.get(host_type, []))
-
-        return hosts
+        return list(self._get_role_index().get(role, []))
 
     def _get_nodes_for_role(self, role):
         nodes = self.gen_dict.get('nodes', {})
-        nodes_for_role = []
-        nodes_for_role.extend(nodes.get(role, []))
-        by_role = self._get_nodes_through_roles(role)
-        for node in by_role:
-            if node not in nodes_for_role:
-                nodes_for_role.append(node)
-        return nodes_for_role
+        return self._merge_nodes(nodes.get(role, []),
+                                 self._get_role_index().get(role, []))
 
     def _get_controllers(self):
         nodes = self.gen_dict.get('nodes', None)
         if not nodes:
             return None
 
-        controllers_list1 = nodes.get('controllers', [])
-        controllers_list2 = self._get_nodes_through_roles('controller')
-
-        for node in controllers_list1:
-            if node not in controllers_list2:
-                controllers_list2.append(node)
-        return controllers_list2
+        return self._merge_nodes(self._get_role_index().get('controller', []),
+                                 nodes.get('controllers', []))
 
     def _configure_infra_hosts(self):
         """Configure the infra hosts."""
@@ -180,25 +354,27 @@ class OSAFileGenerator(object):
                 }
 
         # Set all the common services across all the controllers which
-        # provides the minimal control plane.
+        # provides the minimal control plane.  Each group gets its own dict
+        # (repo hosts are added to later) sharing the host entries, which
+        # are not changed once built.
         self.user_config[SHARED_INFRA_HOSTS] = hosts
-        self.user_config[REPO_INFRA_HOSTS] = copy.deepcopy(hosts)
-        self.user_config[IDENTITY_HOSTS] = copy.deepcopy(hosts)
-        self.user_config['dashboard_hosts'] = copy.deepcopy(hosts)
-        self.user_config['haproxy_hosts'] = copy.deepcopy(hosts)
-        self.user_config['log_hosts'] = copy.deepcopy(hosts)
+        self.user_config[REPO_INFRA_HOSTS] = dict(hosts)
+        self.user_config[IDENTITY_HOSTS] = dict(hosts)
+        self.user_config['dashboard_hosts'] = dict(hosts)
+        self.user_config['haproxy_hosts'] = dict(hosts)
+        self.user_config['log_hosts'] = dict(hosts)
 
         if PRIVATE_COMPUTE_CLOUD in self.get_ref_arch():
             # Private compute cloud adds additional services to the
             # control plane.
-            self.user_config['storage-infra_hosts'] = copy.deepcopy(hosts)
-            self.user_config['network_hosts'] = copy.deepcopy(hosts)
-            self.user_config['image_hosts'] = copy.deepcopy(hosts)
-            self.user_config['compute-infra_hosts'] = copy.deepcopy(hosts)
-            self.user_config['orchestration_hosts'] = copy.deepcopy(hosts)
+            self.user_config['storage-infra_hosts'] = dict(hosts)
+            self.user_config['network_hosts'] = dict(hosts)
+            self.user_config['image_hosts'] = dict(hosts)
+            self.user_config['compute-infra_hosts'] = dict(hosts)
+            self.user_config['orchestration_hosts'] = dict(hosts)
 
         if DBAAS_REF_CLOUD in self.get_ref_arch():
-            self.user_config['trove-infra_hosts'] = copy.deepcopy(hosts)
+            self.user_config['trove-infra_hosts'] = dict(hosts)
 
         return
 
@@ -607,12 +783,8 @@ class OSAFileGenerator(object):
         nodes = self.gen_dict.get('nodes', None)
         if not nodes:
             return None
-        object_nodes = self._get_nodes_for_role('swift-object')
-        md_nodes = self._get_nodes_for_role('swift-metadata')
-        for node in md_nodes:
-            if node not in object_nodes:
-                object_nodes.append(node)
-        return object_nodes
+        return self._merge_nodes(self._get_nodes_for_role('swift-object'),
+                                 self._get_nodes_for_role('swift-metadata'))
 
     def _configure_swift_hosts(self):
         """Configure list of swift_hosts.
@@ -625,14 +797,10 @@ class OSAFileGenerator(object):
             return
 
         def is_converged_metadata_object(meta, object):
-            meta_copy = list(meta)
-            object_copy = list(object)
-            try:
-                for node in meta_copy:
-                    object_copy.remove(node)
-            except ValueError:
-                return False
-            return not object_copy
+            meta_keys = [self._node_key(node) for node in meta]
+            object_keys = [self._node_key(node) for node in object]
+            return (collections.Counter(meta_keys) ==
+                    collections.Counter(object_keys))
 
         object_nodes = self._get_nodes_for_role('swift-object')
         md_nodes = self._get_nodes_for_role('swift-metadata')
@@ -721,7 +889,7 @@ class OSAFileGenerator(object):
                     arch = PPC64LE
                 if arch not in repo_hosts_archs_set:
                     self.user_config[REPO_INFRA_HOSTS][hostname] = \
-                        copy.deepcopy(self.user_config[hosts_type][hostname])
+                        self.user_config[hosts_type][hostname]
                     repo_hosts_archs_set.add(arch)
 
     def _get_repo_hosts_archs_set(self):
@@ -761,6 +929,12 @@ class OSAFileGenerator(object):
     def create_user_config(self):
         """Process the inventory input and generate the OSA user config."""
         self._load_yml()
+        if not self._needs_update(OSA_USER_CFG_FILE):
+            return
+        self._build_user_config()
+        self._dump_yml(self.user_config, OSA_USER_CFG_FILE)
+
+    def _build_user_config(self):
         self._configure_cidr_networks()
         self._configure_infra_hosts()
         self._configure_global_overrides()
@@ -769,8 +943,6 @@ class OSAFileGenerator(object):
         self._configure_swift()
         self._configure_extra_repo_hosts()
 
-        self._dump_yml(self.user_config, OSA_USER_CFG_FILE)
-
     def get_network_interface(self, net_details):
         """Find network interface from the given network details."""
 
@@ -794,15 +966,30 @@ class OSAFileGenerator(object):
         if ext_floating_ip == 'N/A':
             return None
 
-        for net, net_details in networks.iteritems():
-            if 'addr' in net_details:
-                # Check if matching
-                if (netaddr.IPAddress(ext_floating_ip) in
-                   netaddr.IPSet([net_details['addr']])):
-                    return net, net_details
+        net = self.get_network_index(networks).find(ext_floating_ip)
+        if net:
+            return net, networks[net]
 
         return 'openstack-mgmt', networks.get('openstack-mgmt', None)
 
+    def get_network_index(self, networks=None):
+        """Return the address -> network index of the given networks
+           (by default, those of the inventory). The index is reused
+           until the networks are replaced.
+        """
+        if networks is None:
+            networks = self.gen_dict.get('networks', None) or {}
+        if (self._network_index is None or
+                self._network_index.networks is not networks):
+            self._network_index = network_index.NetworkIndex(networks)
+        return self._network_index
+
+    def find_network(self, addr):
+        """Return the name of the most specific inventory network whose
+           CIDR contains the given address, or None.
+        """
+        return self.get_network_index().find(addr)
+
     def find_external_interface(self, ext_floating_ip, networks):
         """Find external interface based on the network address that matches
            external-floating-ipaddr.
@@ -830,6 +1017,8 @@ class OSAFileGenerator(object):
 
     def generate_haproxy(self):
         """Generate user variable file for HAProxy."""
+        if not self._needs_update(OSA_USER_VAR_HAPROXY):
+            return
         external_vip = self._get_external_vip_value()
         internal_vip = self.gen_dict.get('internal-floating-ipaddr', 'N/A')
         networks = self.gen_dict.get('networks', None)
@@ -846,6 +1035,8 @@ class OSAFileGenerator(object):
 
     def generate_ceilometer(self):
         """Generate user variable file for ceilometer."""
+        if not self._needs_update(OSA_USER_VAR_CEILOMETER):
+            return
         settings = {
             'swift_ceilometer_enabled': False,
             'nova_ceilometer_enabled': False,
@@ -854,6 +1045,8 @@ class OSAFileGenerator(object):
 
     def generate_rabbitmq(self):
         """Generate user variable file for rabbitmq."""
+        if not self._needs_update(OSA_USER_VAR_RABBITMQ):
+            return
         settings = {
             # Disable rabbitmq management plugin by default
             'rabbitmq_plugins': [{
@@ -875,6 +1068,9 @@ class OSAFileGenerator(object):
         if not mons:
             return
 
+        if not self._needs_update(OSA_USER_VAR_CEPH):
+            return
+
         monitors = []
         for c in mons:
             monitors.append(c.get('openstack-stg-addr', 'N/A'))
@@ -890,16 +1086,8 @@ class OSAFileGenerator(object):
         self._dump_yml(settings, OSA_USER_VAR_CEPH)
 
     def _get_ceph_monitors(self):
-        # Get ceph monitors by template name
-        nodes = self.gen_dict.get('nodes', {})
-        mons = []
-        mons.extend(nodes.get('ceph-monitor', []))
-
-        # Get ceph monitors by role
-        role_mons = self._get_nodes_through_roles('ceph-monitor')
-        for mon in role_mons:
-            if mon not in mons:
-                mons.append(mon)
+        # Get ceph monitors by template name, then by role
+        mons = self._get_nodes_for_role('ceph-monitor')
         if mons:
             return mons
 
@@ -937,6 +1125,12 @@ class OSAFileGenerator(object):
         """Generate user variable file for deployment environment variables."""
         env_vars_dict = self.gen_dict.get('deployment-environment')
         if env_vars_dict:
+            if not self._needs_update(OSA_USER_VAR_DEPLOY_ENV):
+                return
+            if 'global_overrides' not in self.user_config:
+                # The user config was not regenerated by this incremental
+                # run, but the load balancer addresses are needed here
+                self._build_user_config()
             if 'http_proxy' in env_vars_dict or 'https_proxy' in env_vars_dict:
                 # Make sure no_proxy is defined and has the required
                 # addresses
@@ -947,23 +1141,121 @@ class OSAFileGenerator(object):
             self._dump_yml(settings, OSA_USER_VAR_DEPLOY_ENV)
 
 
-def process_inventory(inv_name, output_dir):
+def process_inventory(inv_name, output_dir, incremental=False):
     """Process the input inventory file.
 
     :param inv_name: The path name of the input genesis inventory.
     :param output_dir: The name of path for the generated files.
+    :param incremental: Only regenerate the files whose inputs changed
+                        since the last incremental run.
+    :returns: The names of the files written.
     """
-    generator = OSAFileGenerator(inv_name, output_dir)
+    generator = OSAFileGenerator(inv_name, output_dir, incremental)
     generator._load_yml()
     if 'reference-architecture' not in generator.gen_dict:
         print "The inventory file is missing the reference-architecture."
         sys.exit(1)
 
+    if incremental:
+        generator.load_fingerprints()
     generator.create_user_config()
     generator.generate_haproxy()
     generator.generate_ceilometer()
     generator.generate_ceph()
     generator.generate_deployment_env_vars()
+    if incremental:
+        generator.save_fingerprints()
+        if generator.touched_files:
+            for fname in generator.touched_files:
+                print "Updated %s" % os.path.join(output_dir, fname)
+        else:
+            print "No files updated."
+    return generator.touched_files
+
+
+def _process_batch_job(job):
+    """Process one inventory of a batch, in a worker process.
+
+    :param job: (inventory path, output directory, incremental).
+    :returns: (inventory path, output directory, seconds taken, error
+              message or None).
+    """
+    inv_name, output_dir, incremental = job
+    start = time.time()
+    error = None
+    try:
+        process_inventory(inv_name, output_dir, incremental)
+    except SystemExit as ex:
+        if ex.code:
+            error = 'exited with status %s' % ex.code
+    except Exception as ex:
+        error = '%s: %s' % (type(ex).__name__, ex)
+    sys.stdout.flush()
+    return inv_name, output_dir, time.time() - start, error
+
+
+def process_batch(pairs, jobs=None, incremental=False):
+    """Process many inventories in one run, in parallel.
+
+    A failure to process one inventory doesn't stop the others.  A summary
+    of the time taken by each inventory and of the failures is printed.
+
+    :param pairs: List of (inventory path, output directory).
+    :param jobs: Number of worker processes (default: number of cpus).
+    :param incremental: Only regenerate the files whose inputs changed.
+    :returns: The number of inventories which failed.
+    """
+    batch = [(inv_name, output_dir, incremental)
+             for inv_name, output_dir in pairs]
+    import multiprocessing
+
+    jobs = min(jobs or multiprocessing.cpu_count(), len(batch))
+    start = time.time()
+    if jobs > 1:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            results = pool.map(_process_batch_job, batch, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_process_batch_job(job) for job in batch]
+
+    failures = [result for result in results if result[3]]
+    print "Batch summary:"
+    for inv_name, output_dir, seconds, error in results:
+        print "  %-6s %7.2fs  %s -> %s" % ('FAILED' if error else 'OK',
+                                           seconds, inv_name, output_dir)
+    print "%d inventories processed in %.2fs using %d processes, %d failed." \
+        % (len(results), time.time() - start, jobs, len(failures))
+    for inv_name, output_dir, seconds, error in failures:
+        print "  %s: %s" % (inv_name, error)
+    return len(failures)
+
+
+def read_manifest(manifest):
+    """Read a batch manifest file.
+
+    Each line holds an inventory path and the output directory for it,
+    separated by white space.  Blank lines and lines starting with '#'
+    are ignored.  Relative paths are relative to the manifest's directory.
+
+    :returns: List of (inventory path, output directory).
+    """
+    base_dir = os.path.dirname(manifest)
+    pairs = []
+    with open(manifest, 'r') as stream:
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split()
+            if len(fields) != 2:
+                raise ValueError('%s, line %d: expected an inventory path and '
+                                 'an output directory' % (manifest, line_no))
+            pairs.append(tuple(os.path.join(base_dir, field)
+                               for field in fields))
+    return pairs
 
 
 def parse_command():
@@ -972,16 +1264,51 @@ def parse_command():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         description=('A command to generate the ansible user configuration'
                      ' based on the Genesis inventory YAML file.'))
-    parser.add_argument('-i', '--input-file', required=True,
-                        help=('Path to the Genesis inventory YAML file'))
-    parser.add_argument('-d', '--output-dir', default='.',
+    parser.add_argument('-i', '--input-file', action='append',
+                        help=('Path to the Genesis inventory YAML file.  May '
+                              'be given more than once (with a -d for '
+                              'each) to process several inventories'))
+    parser.add_argument('-d', '--output-dir', action='append',
                         help=('Path to the OpenStack user config file to '
-                              'be generated'))
+                              'be generated (default: .)'))
+    parser.add_argument('-m', '--manifest',
+                        help=('Path to a file listing inventories to '
+                              'process, one "<inventory> <output dir>" pair '
+                              'per line'))
+    parser.add_argument('-j', '--jobs', type=int,
+                        help=('Number of inventories to process in parallel '
+                              'in batch mode (default: number of cpus)'))
+    parser.add_argument('--incremental', action='store_true',
+                        help=('Only regenerate (and atomically replace) the '
+                              'files whose inputs changed since the last '
+                              'incremental run, and list the files '
+                              'updated'))
 
     parser.set_defaults(func=process_inventory)
     return parser
 
 
+def get_inventory_pairs(parser, args):
+    """Return the (inventory, output directory) pairs to process."""
+    inputs = args.input_file or []
+    outputs = args.output_dir or []
+    if not inputs and not args.manifest:
+        parser.error('an input file (-i) or a manifest (-m) is required')
+    if len(inputs) == 1 and not outputs:
+        outputs = ['.']
+    if len(inputs) != len(outputs):
+        parser.error('an output directory (-d) is required for each input '
+                     'file (-i)')
+
+    pairs = zip(inputs, outputs)
+    if args.manifest:
+        try:
+            pairs.extend(read_manifest(args.manifest))
+        except (IOError, ValueError) as ex:
+            parser.error(str(ex))
+    return pairs
+
+
 def signal_handler(signal, frame):
     """Signal handler to for processing, e.g. keyboard interrupt signals."""
     sys.exit(0)
@@ -997,7 +1324,14 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    args.func(args.input_file, args.output_dir)
+    pairs = get_inventory_pairs(parser, args)
+    if len(pairs) == 1 and not args.manifest:
+        inv_name, output_dir = pairs[0]
+        args.func(inv_name, output_dir, args.incremental)
+        return 0
+
+    if process_batch(pairs, args.jobs, args.incremental):
+        sys.exit(1)
     return 0
 
 
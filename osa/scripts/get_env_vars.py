@@ -21,24 +21,22 @@ then any needed variables will already be set so we can safely skip this.
 Otherwise, the user will need to manually set any http_proxy settings.
 """
 
-import argparse
 import signal
 import sys
-try:
-    import yaml
-except Exception:
-    sys.stderr.write("Environment variables not set. Python libraries are "
-                     "not available.\n")
-    sys.exit(1)
+
+# This is run from shell loops, so keep startup fast: the inventory is
+# usually answered from the inventory loader's cache without importing
+# yaml, and argparse is only imported to parse the command line.
+import inventory_loader
 
 
 def _load_yml(inventory_name):
-    with open(inventory_name, 'r') as stream:
-        try:
-            gen_dict = yaml.safe_load(stream)
-        except yaml.YAMLError:
-            raise
-    return gen_dict
+    try:
+        return inventory_loader.load_file(inventory_name)
+    except ImportError:
+        sys.stderr.write("Environment variables not set. Python libraries "
+                         "are not available.\n")
+        sys.exit(1)
 
 
 def process_inventory(inv_name):
@@ -70,6 +68,8 @@ def process_inventory(inv_name):
 
 def parse_command():
     """Parse the command arguments for generate user config."""
+    import argparse
+
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
         description=('A command to retrieve the environment variables'
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+#
+# Copyright 2017 IBM US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Loading of the genesis inventory (/var/oprc/inventory.yml) shared by the
+tools which read it.
+
+The inventory is parsed with the libyaml based safe loader when PyYAML was
+built with it. The parsed inventory is kept in a cache file next to the
+inventory (.<inventory file name>.cache) so the tools run repeatedly during
+a deploy don't parse it again. The cache is keyed by the inventory's
+modification time, size and the hash of its contents, and is only trusted
+when owned by the user running the tool. The contents are hashed unless
+the modification time and size are unchanged and the cache was written
+well after that modification time; a file rewritten with the same size
+within one tick of a coarse filesystem clock keeps its modification time.
+
+yaml is only imported when a document actually has to be parsed, so tools
+answered from the cache don't pay for importing it.
+"""
+
+import cPickle as pickle
+import hashlib
+import os
+import tempfile
+import time
+
+# Bumped whenever the layout of the cache file changes
+CACHE_VERSION = 2
+
+# How long after its modification time a file may still be rewritten
+# without the time changing, allowing for coarse filesystem timestamps
+MTIME_RESOLUTION = 2
+
+
+def _parse(stream):
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(stream, Loader=loader)
+
+
+def cache_path(path):
+    """Return the path of the parse cache kept for the given file."""
+    dirname, basename = os.path.split(path)
+    return os.path.join(dirname, '.' + basename + '.cache')
+
+
+def _read_cache(path):
+    try:
+        with open(cache_path(path), 'rb') as stream:
+            if os.fstat(stream.fileno()).st_uid != os.geteuid():
+                return None
+            cached = pickle.load(stream)
+    except Exception:
+        return None
+
+    if not isinstance(cached, dict) or cached.get('version') != CACHE_VERSION:
+        return None
+    return cached
+
+
+def _write_cache(path, stat, digest, data):
+    cached = {
+        'version': CACHE_VERSION,
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'sha1': digest,
+        'written': time.time(),
+        'data': data,
+    }
+    dirname = os.path.dirname(path) or '.'
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=dirname,
+                                        prefix=os.path.basename(path) + '.')
+    except (IOError, OSError):
+        # The directory isn't writable; go without the cache
+        return
+
+    try:
+        with os.fdopen(fd, 'wb') as stream:
+            pickle.dump(cached, stream, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, cache_path(path))
+    except Exception:
+        os.remove(tmp_path)
+
+
+def load(stream):
+    """Load the YAML document from the given stream.
+
+    If the stream is a file, the parse cache of that file is used (and
+    updated). Each call returns a separate copy of the data, so callers
+    may change it.
+
+    :param stream: A file or string holding a YAML document.
+    :raises: yaml.YAMLError if the document can't be parsed.
+    """
+    path = getattr(stream, 'name', None)
+    if not isinstance(path, basestring) or not os.path.isfile(path):
+        return _parse(stream)
+
+    stat = os.stat(path)
+    cached = _read_cache(path)
+    if (cached and cached['mtime'] == stat.st_mtime and
+            cached['size'] == stat.st_size and
+            cached['written'] - stat.st_mtime > MTIME_RESOLUTION):
+        return cached['data']
+
+    contents = stream.read()
+    digest = hashlib.sha1(contents).hexdigest()
+    if cached and cached['sha1'] == digest:
+        data = cached['data']
+    else:
+        data = _parse(contents)
+    _write_cache(path, stat, digest, data)
+    return data
+
+
+def load_file(name):
+    """Load the YAML file with the given name (see load)."""
+    with open(name, 'r') as stream:
+        return load(stream)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+#
+# Copyright 2017 IBM US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Address to network lookup over the networks section of the genesis
+inventory.
+
+netaddr is imported when an index is built rather than with this module,
+so the tools importing it only pay for netaddr when they look up networks.
+"""
+
+import bisect
+
+
+class NetworkIndex(object):
+    """Longest prefix match of addresses against the inventory networks.
+
+    The CIDRs of the networks (their 'addr' values) are flattened into a
+    sorted table of disjoint integer ranges, each belonging to the most
+    specific network covering it, so a lookup is a binary search. Where
+    two networks have the same CIDR, the first one listed wins.
+    """
+
+    def __init__(self, networks):
+        """Initializer.
+
+        :param networks: The networks section of the genesis inventory.
+        :raises: netaddr.AddrFormatError if a network's addr is not a
+                 valid CIDR.
+        """
+        import netaddr
+
+        super(NetworkIndex, self).__init__()
+        self._netaddr = netaddr
+        self.networks = networks or {}
+        self.cidrs = {}
+        # ip version -> (range starts, [(start, end, network name)])
+        self._tables = {}
+
+        entries = {}
+        for order, (name, details) in enumerate(self.networks.iteritems()):
+            if not details or 'addr' not in details:
+                continue
+            cidr = netaddr.IPNetwork(details['addr'])
+            self.cidrs[name] = cidr
+            # Less specific networks first, and for identical CIDRs the
+            # first listed last (on top of the stack below).
+            entries.setdefault(cidr.version, []).append(
+                (cidr.first, cidr.prefixlen, -order, cidr.last, name))
+
+        for version, version_entries in entries.iteritems():
+            ranges = self._build_ranges(sorted(version_entries))
+            self._tables[version] = ([start for start, _, _ in ranges],
+                                     ranges)
+
+    @staticmethod
+    def _build_ranges(entries):
+        # CIDRs are either disjoint or nested, so a stack of the networks
+        # enclosing the current position is enough to split them into
+        # disjoint ranges.
+        ranges = []
+        stack = []
+        pos = None
+
+        def add(start, end, name):
+            if start <= end:
+                ranges.append((start, end, name))
+
+        for first, _, _, last, name in entries:
+            while stack and stack[-1][0] < first:
+                top_last, top_name = stack.pop()
+                add(pos, top_last, top_name)
+                pos = top_last + 1
+            if stack:
+                add(pos, first - 1, stack[-1][1])
+            stack.append((last, name))
+            pos = first
+        while stack:
+            top_last, top_name = stack.pop()
+            add(pos, top_last, top_name)
+            pos = top_last + 1
+        return ranges
+
+    def find(self, addr):
+        """Return the name of the most specific network containing addr.
+
+        :param addr: An address, with or without a prefix length
+                     ('1.2.3.4' or '1.2.3.4/22').
+        :returns: The network name, or None if no network contains it.
+        :raises: netaddr.AddrFormatError if addr is not a valid address.
+        """
+        ip = self._netaddr.IPNetwork(addr).ip
+        table = self._tables.get(ip.version)
+        if not table:
+            return None
+        starts, ranges = table
+        value = int(ip)
+        i = bisect.bisect_right(starts, value) - 1
+        if i >= 0 and value <= ranges[i][1]:
+            return ranges[i][2]
+        return None
+
+    def contains(self, name, addr):
+        """Check whether addr is within the CIDR of the named network."""
+        cidr = self.cidrs.get(name)
+        if cidr is None:
+            return False
+        return self._netaddr.IPNetwork(addr).ip in cidr
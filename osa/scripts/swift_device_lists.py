@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+#
+# Copyright 2017 IBM US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Checks of the swift ring device lists of all the hosts of a genesis
+inventory, run in one process on the deployer.
+
+Restrictions on the ring device lists:
+  1. If account and container ring device lists are specified
+     on a node, the values must match.  Account and container rings
+     will have the same disks.
+  2. If account, container, and object ring devices are specified
+     on a node, the metadata and object lists must be either
+     mutually exclusive or equal.  No partial overlaps.
+
+The lists of a node are its domain-settings <ring>-ring-devices, or those
+of its node template. The same checks can be made of the disks actually
+prepared on the hosts, from the disk prep manifests the swift storage
+setup writes.
+"""
+
+import argparse
+import json
+import signal
+import sys
+
+import inventory_loader
+
+RING_TYPES = ('account', 'container', 'object')
+
+# The name the hosts go by in the Ansible inventory
+NODENAME_FIELD = 'ipv4-pxe'
+
+
+def check_device_lists(device_lists):
+    """Check the ring device lists of one host.
+
+    :param device_lists: A dict of ring type to the list of devices.
+    :returns: A (list of violation messages, account_matches_object)
+              tuple. account_matches_object is True when the account and
+              object rings use the same devices.
+    """
+    account_set = set(device_lists.get('account') or ())
+    container_set = set(device_lists.get('container') or ())
+    object_set = set(device_lists.get('object') or ())
+
+    violations = []
+    account_matches_object = False
+    if account_set and container_set:
+        sym_diff_set = account_set ^ container_set
+        if sym_diff_set:
+            violations.append('Account and container must be equal: %s' %
+                              ', '.join(sorted(sym_diff_set)))
+
+    if account_set and container_set and object_set:
+        sym_diff_set = account_set ^ object_set
+        overlap_set = account_set & object_set
+        if sym_diff_set and overlap_set:
+            violations.append('Account and object must be equal or '
+                              'mutually exclusive: %s' %
+                              ', '.join(sorted(sym_diff_set)))
+        if not sym_diff_set:
+            account_matches_object = True
+    return violations, account_matches_object
+
+
+def get_inventory_device_lists(inventory):
+    """Return the ring device lists of the nodes of a genesis inventory.
+
+    :returns: A dict of nodename to a dict of ring type to the list of
+              devices, for the nodes with at least one ring device list.
+    """
+    templates = inventory.get('node-templates') or {}
+    nodes = inventory.get('nodes') or {}
+    host_lists = {}
+    for template_name in sorted(nodes):
+        for node in nodes[template_name] or []:
+            template = templates.get(node.get('template')) or {}
+            template_ds = template.get('domain-settings') or {}
+            host_ds = node.get('domain-settings') or {}
+            device_lists = {}
+            for ring in RING_TYPES:
+                key = ring + '-ring-devices'
+                devices = host_ds.get(key, template_ds.get(key))
+                if devices:
+                    device_lists[ring] = devices
+            if device_lists:
+                host_lists[node.get(NODENAME_FIELD)] = device_lists
+    return host_lists
+
+
+def read_manifest(filename):
+    """Return the ring device lists of a disk prep manifest.
+
+    :returns: A dict of ring type to the list of device names.
+    """
+    device_lists = {}
+    with open(filename, 'r') as stream:
+        for line in stream:
+            if line.strip():
+                entry = json.loads(line)
+                device_lists.setdefault(entry['ring'], []).append(
+                    entry['device'])
+    return device_lists
+
+
+def validate_hosts(host_lists):
+    """Check the ring device lists of many hosts.
+
+    :param host_lists: A dict of host name to its ring device lists.
+    :returns: A dict of host name to a dict with the 'violations' found
+              for the host and whether its 'account_matches_object'.
+    """
+    results = {}
+    for host, device_lists in host_lists.iteritems():
+        violations, account_matches_object = check_device_lists(
+            device_lists)
+        results[host] = {'violations': violations,
+                         'account_matches_object': account_matches_object}
+    return results
+
+
+def parse_manifest(value):
+    """Parse a manifest argument (<nodename>:<disk prep manifest file>)."""
+    try:
+        nodename, manifest = value.split(':', 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            '%s is not in the form <nodename>:<file>' % value)
+    return nodename, manifest
+
+
+def parse_command():
+    """Parse the command arguments for the swift device list checks."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=('Check the swift account, container, and object ring '
+                     'device lists of all the\nhosts of the Genesis '
+                     'inventory, or of their disk prep manifests.'))
+    parser.add_argument('-i', '--input-file',
+                        help='Path to the Genesis inventory YAML file.')
+    parser.add_argument('-m', '--manifest', dest='manifests',
+                        action='append', type=parse_manifest, default=[],
+                        help=('A disk prep manifest of a host, as '
+                              '<nodename>:<manifest file>.\nMay be given '
+                              'many times.'))
+    parser.add_argument('--json', action='store_true',
+                        help=('Print the results of all the hosts as a '
+                              'JSON document.'))
+    return parser
+
+
+def signal_handler(signal, frame):
+    """Signal handler to for processing, e.g. keyboard interrupt signals."""
+    sys.exit(0)
+
+
+def main():
+    """Main function."""
+    parser = parse_command()
+    args = parser.parse_args()
+    signal.signal(signal.SIGINT, signal_handler)
+
+    if not args.input_file and not args.manifests:
+        parser.print_help()
+        sys.exit(1)
+
+    host_lists = {}
+    if args.input_file:
+        host_lists.update(get_inventory_device_lists(
+            inventory_loader.load_file(args.input_file)))
+    for nodename, manifest in args.manifests:
+        host_lists[nodename] = read_manifest(manifest)
+
+    results = validate_hosts(host_lists)
+    if args.json:
+        print json.dumps(results, indent=4, sort_keys=True)
+    else:
+        for host in sorted(results):
+            for violation in results[host]['violations']:
+                print '%s: %s' % (host, violation)
+
+    if any(result['violations'] for result in results.itervalues()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,8 +15,15 @@
 # limitations under the License.
 
 import argparse
+import json
+import os
 import sys
-import yaml
+
+# The genesis inventory loader is shared with the OSA scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..', 'osa', 'scripts'))
+import inventory_loader
+import network_index
 
 SWIFT = 'swift'
 SWIFT_MIN = 'swift-minimum-hardware'
@@ -25,24 +32,57 @@ DBAAS = 'dbaas'
 COMPUTE = 'private-compute-cloud'
 BASE_ARCHS = {SWIFT, COMPUTE, CEPH}
 
+REF_ARCH_PATH = 'reference-architecture'
+TEMPLATES_PATH = 'node-templates'
+NODES_PATH = 'nodes'
+
+# The address of a node on a network is kept under '<network name>-addr'
+ADDR_SUFFIX = '-addr'
+MGMT_ADDR = 'openstack-mgmt' + ADDR_SUFFIX
+
+# Device lists kept on nodes, or in their domain-settings
+CEPH_DEVICE_LISTS = ('osd-devices', 'journal-devices')
+SWIFT_DEVICE_LISTS = ('account-ring-disks', 'container-ring-disks',
+                      'object-ring-disks')
+
+
+class ConfigError(Exception):
+    # path is where in the config the problem was found, for example
+    # 'node-templates.controllers.networks', when it is known.
+    def __init__(self, msg, path=None):
+        super(ConfigError, self).__init__(msg)
+        self.path = path
 
-class UnsupportedConfig(Exception):
+
+class UnsupportedConfig(ConfigError):
     pass
 
 
-class InvalidDeviceList(Exception):
+class InvalidDeviceList(ConfigError):
     pass
 
 
+def _report(errors, ex):
+    # Raise a violation, or add it to errors and carry on when all the
+    # violations are being collected (errors is a list).
+    if errors is None:
+        raise ex
+    errors.append(ex)
+
+
 def validate(file_path):
     try:
         inventory = _load_yml(file_path)
         validate_reference_architecture(inventory)
-        validate_private_compute_cloud(inventory)
-        validate_swift(inventory)
-        validate_ceph(inventory)
+        # The roles to node templates map is built once and shared by the
+        # validators which need it
+        roles_to_templates = _get_roles_to_templates(inventory)
+        validate_private_compute_cloud(inventory, roles_to_templates)
+        validate_swift(inventory, roles_to_templates)
+        validate_ceph(inventory, roles_to_templates)
         validate_ops_mgr(inventory)
-        validate_propagation_roles(inventory)
+        validate_propagation_roles(inventory, roles_to_templates)
+        validate_nodes(inventory)
     except Exception as ex:
         print ex
         sys.exit(1)
@@ -51,40 +91,62 @@ def validate(file_path):
 def validate_reference_architecture(inventory):
     reference_architecture = inventory.get('reference-architecture')
     if not reference_architecture:
-        raise UnsupportedConfig('Missing reference-architecture setting.')
+        raise UnsupportedConfig('Missing reference-architecture setting.',
+                                path=REF_ARCH_PATH)
 
     # Validate that we have at least one base architecture in the list
     if len(BASE_ARCHS.intersection(reference_architecture)) == 0:
-        raise UnsupportedConfig('Missing base architecture')
+        raise UnsupportedConfig('Missing base architecture',
+                                path=REF_ARCH_PATH)
 
     if (DBAAS in reference_architecture and
             COMPUTE not in reference_architecture):
         raise UnsupportedConfig('dbaas cannot be used without '
-                                'private-compute-cloud.')
+                                'private-compute-cloud.',
+                                path=REF_ARCH_PATH)
 
     if (SWIFT_MIN in reference_architecture and
             'swift' not in reference_architecture):
-        raise UnsupportedConfig('swift-minimum-hardware cannot be used alone')
+        raise UnsupportedConfig('swift-minimum-hardware cannot be used alone',
+                                path=REF_ARCH_PATH)
 
     # Validate ceph standalone is alone
     if CEPH in reference_architecture and len(reference_architecture) != 1:
         raise UnsupportedConfig('The ceph-standalone reference architecture '
                                 'cannot be used in conjunction with other '
-                                'reference architectures.')
+                                'reference architectures.',
+                                path=REF_ARCH_PATH)
 
 
-def _is_network_existing(templates, required_net):
-    """ Check if a required network exists in all the given node templates
-    """
-    if not templates:
-        return True
+def _named_templates(config, templates):
+    # Return (name, template) pairs for the node templates of a role, in
+    # name order.  The roles to templates map holds the templates only, so
+    # they are named from the node-templates of the config.
+    names = {id(template): name for name, template in
+             (config.get('node-templates') or {}).iteritems()}
+    return sorted(((names.get(id(template)), template)
+                   for template in templates or []),
+                  key=lambda named: named[0])
 
-    for template in templates:
-        nets = template.get('networks', [])
-        if required_net not in nets:
-            return False
 
-    return True
+def _template_path(name, *keys):
+    # The path of a node template, or of an item in it, for example
+    # 'node-templates.controllers.networks'
+    if name is None:
+        return TEMPLATES_PATH
+    return '.'.join((TEMPLATES_PATH, name) + keys)
+
+
+def _check_templates_network(config, templates, required_net, msg,
+                             errors=None):
+    """ Check that a required network exists in each of the given node
+        templates.  msg is formatted with the network and template names.
+    """
+    for name, template in _named_templates(config, templates):
+        if required_net not in template.get('networks', []):
+            _report(errors, UnsupportedConfig(
+                msg % {'net': required_net, 'template': name},
+                path=_template_path(name, 'networks')))
 
 
 def _validate_private_compute_cloud_node_templates(roles_to_templates):
@@ -100,15 +162,16 @@ def _validate_private_compute_cloud_node_templates(roles_to_templates):
         msg = ('The configuration must either have a node template named '
                '\'controllers\' or one node template which has the '
                'controller role.')
-        raise UnsupportedConfig(msg)
+        raise UnsupportedConfig(msg, path=TEMPLATES_PATH)
 
     if not roles_to_templates.get('compute'):
         msg = ('The configuration must either have a node template named '
                '\'compute\' or one node template which has the compute role.')
-        raise UnsupportedConfig(msg)
+        raise UnsupportedConfig(msg, path=TEMPLATES_PATH)
 
 
-def _validate_private_compute_cloud_networks(config, roles_to_templates):
+def _validate_private_compute_cloud_networks(config, roles_to_templates,
+                                             errors=None):
     """ Validate that the networks required for private-compute-cloud exist
     """
     # These networks should be configured on controllers and compute nodes
@@ -118,29 +181,30 @@ def _validate_private_compute_cloud_networks(config, roles_to_templates):
     for required_net in required_nets:
         if required_net not in config.get('networks', []):
             msg = ('The required network %s is missing.' % required_net)
-            raise UnsupportedConfig(msg)
+            _report(errors, UnsupportedConfig(
+                msg, path='networks.' + required_net))
 
     # Validate that the controller node templates have the required networks
     for required_net in required_nets:
-        if not _is_network_existing(roles_to_templates.get('controller'),
-                                    required_net):
-            msg = ('Missing network %(net)s in a node template with '
-                   'controller role')
-            raise UnsupportedConfig(msg % {'net': required_net})
-        if not _is_network_existing(roles_to_templates.get('controllers'),
-                                    required_net):
-            msg = ('Missing network %(net)s in the controllers node template')
-            raise UnsupportedConfig(msg % {'net': required_net})
+        msg = ('Missing network %(net)s in the node template %(template)s '
+               'with controller role')
+        _check_templates_network(config, roles_to_templates.get('controller'),
+                                 required_net, msg, errors)
+        msg = ('Missing network %(net)s in the controllers node template')
+        _check_templates_network(config,
+                                 roles_to_templates.get('controllers'),
+                                 required_net, msg, errors)
 
     # Validate that the compute node templates have the required networks
     for required_net in required_nets:
-        if not _is_network_existing(roles_to_templates.get('compute'),
-                                    required_net):
-            msg = ('Missing network %(net)s in a compute node template')
-            raise UnsupportedConfig(msg % {'net': required_net})
+        msg = ('Missing network %(net)s in the compute node template '
+               '%(template)s')
+        _check_templates_network(config, roles_to_templates.get('compute'),
+                                 required_net, msg, errors)
 
 
-def validate_private_compute_cloud(inventory):
+def validate_private_compute_cloud(inventory, roles_to_templates=None,
+                                   errors=None):
     """ Validate private-compute-cloud reference architecture configuration
     """
 
@@ -148,12 +212,14 @@ def validate_private_compute_cloud(inventory):
     if 'private-compute-cloud' not in reference_architecture:
         return
 
-    roles_to_templates = _get_roles_to_templates(inventory)
+    if roles_to_templates is None:
+        roles_to_templates = _get_roles_to_templates(inventory)
     _validate_private_compute_cloud_node_templates(roles_to_templates)
-    _validate_private_compute_cloud_networks(inventory, roles_to_templates)
+    _validate_private_compute_cloud_networks(inventory, roles_to_templates,
+                                             errors=errors)
 
 
-def validate_swift(inventory):
+def validate_swift(inventory, roles_to_templates=None, errors=None):
     # We only support these layouts for Swift nodes and services:
     # proxy, metadata, object nodes with ring data set appropriately
     # proxy, converged object and metadata
@@ -164,14 +230,25 @@ def validate_swift(inventory):
     if 'swift' not in reference_architecture:
         return
 
-    _validate_rings_match_roles(inventory)
-    converged_metadata_object = _has_converged_metadata_object(inventory)
-    separate_metadata_object = _has_separate_metadata_object(inventory)
-    roles_to_templates = _get_roles_to_templates(inventory)
+    if roles_to_templates is None:
+        roles_to_templates = _get_roles_to_templates(inventory)
+    ring_errors = []
+    _validate_rings_match_roles(inventory, roles_to_templates,
+                                errors=ring_errors)
+    if ring_errors:
+        # The layout checks below would only report the same templates
+        # again
+        for ex in ring_errors:
+            _report(errors, ex)
+        return
+    converged_metadata_object = _has_converged_metadata_object(
+        inventory, roles_to_templates)
+    separate_metadata_object = _has_separate_metadata_object(
+        inventory, roles_to_templates)
     if (not roles_to_templates.get('controller', []) and
             not roles_to_templates.get('controllers', [])):
             msg = ('The configuration requires at least one controller node.')
-            raise UnsupportedConfig(msg)
+            raise UnsupportedConfig(msg, path=TEMPLATES_PATH)
 
     if SWIFT_MIN in reference_architecture:
         # Note this remains a template-only check rather than a role check.
@@ -180,7 +257,8 @@ def validate_swift(inventory):
         if 'swift-proxy' in inventory.get('node-templates'):
             msg = ('The swift-proxy node template must not be used with the '
                    'swift-minimum-hardware reference architecture.')
-            raise UnsupportedConfig(msg)
+            raise UnsupportedConfig(msg,
+                                    path=TEMPLATES_PATH + '.swift-proxy')
 
         if 'controllers' not in inventory.get('node-templates') and \
                 'swift-proxy' not in roles_to_templates:
@@ -188,81 +266,96 @@ def validate_swift(inventory):
                    'specified a node template named \'controllers\' must be '
                    'present, or a node template must have the swift-proxy '
                    'role.')
-            raise UnsupportedConfig(msg)
+            raise UnsupportedConfig(msg, path=TEMPLATES_PATH)
         if not converged_metadata_object:
             msg = ('When the swift-minimum-hardware reference architecture is '
                    'specified, the account, container, and object rings must '
                    'be converged in the swift-object node template.')
-            raise UnsupportedConfig(msg)
+            raise UnsupportedConfig(msg, path=TEMPLATES_PATH)
     else:
-        roles_to_templates = _get_roles_to_templates(inventory)
         # In non-swift min hardware configurations the swift proxy must
         # run on a swift-proxy named template or a template with the
         # swift-proxy role.
         if 'swift-proxy' not in roles_to_templates:
             msg = 'The swift-proxy node template was not found.'
-            raise UnsupportedConfig(msg)
+            raise UnsupportedConfig(msg, path=TEMPLATES_PATH)
 
         if not (converged_metadata_object or separate_metadata_object):
             msg = ('The configuration of the swift-metadata, and swift-object '
                    'nodes and their corresponding account, container, and '
                    'object rings organization is not supported.')
-            raise UnsupportedConfig(msg)
+            raise UnsupportedConfig(msg, path=TEMPLATES_PATH)
 
 
-def _validate_rings_match_roles(config):
-    roles_to_templates = _get_roles_to_templates(config)
+def _validate_rings_match_roles(config, roles_to_templates=None,
+                                errors=None):
+    if roles_to_templates is None:
+        roles_to_templates = _get_roles_to_templates(config)
     md_rings = {'account-ring-devices',
                 'container-ring-devices'}
     object_ring = 'object-ring-devices'
 
     # The templates with the metadata role must have the metadata rings
     md_templates = roles_to_templates.get('swift-metadata', [])
-    for template in md_templates:
+    for name, template in _named_templates(config, md_templates):
         domain_settings = template.get('domain-settings', {})
-        if not md_rings.issubset(domain_settings.keys()):
-            msg = ('One or more node templates with the swift-metadata role '
-                   'is missing the account and container ring device lists.')
-            raise UnsupportedConfig(msg)
+        missing = md_rings.difference(domain_settings.keys())
+        if missing:
+            msg = ('The node template %(template)s with the swift-metadata '
+                   'role is missing the account and container ring device '
+                   'lists.')
+            _report(errors, UnsupportedConfig(
+                msg % {'template': name},
+                path=_template_path(name, 'domain-settings',
+                                    sorted(missing)[0])))
 
     # The templates with the object role must have the object ring
     obj_templates = roles_to_templates.get('swift-object', [])
-    for template in obj_templates:
+    ring_role_templates = {id(template)
+                           for template in md_templates + obj_templates}
+    for name, template in _named_templates(config, obj_templates):
         domain_settings = template.get('domain-settings', {})
         if object_ring not in domain_settings:
-            msg = ('One or more node templates with the swift-object role '
-                   'is missing the object ring device list.')
-            raise UnsupportedConfig(msg)
+            msg = ('The node template %(template)s with the swift-object '
+                   'role is missing the object ring device list.')
+            _report(errors, UnsupportedConfig(
+                msg % {'template': name},
+                path=_template_path(name, 'domain-settings', object_ring)))
 
     # Templates with the metadata rings must be in the metadata role set or
     # the object role set.  Note the "object role set" option
     # is allowed for backward compatibility for the converged case where
     # the swift-object template has both metadata and object rings.
     # Templates with the object ring must have the object role
-    for role, templates in roles_to_templates.iteritems():
-        for template in templates:
-            if template in obj_templates or template in md_templates:
-                continue
-            domain_settings = template.get('domain-settings', {})
-            if not domain_settings:
-                continue
-            if md_rings.issubset(domain_settings.keys()):
-                msg = ('One or more node templates has account and container '
-                       'ring device lists but does not have the '
-                       'swift-metadata or swift-object role.')
-                raise UnsupportedConfig(msg)
-
-            if object_ring in domain_settings:
-                msg = ('One or more node templates has the object ring device '
-                       'list but does not have the swift-object role.')
-                raise UnsupportedConfig(msg)
-
-
-def _has_converged_metadata_object(inventory):
-    roles_to_templates = _get_roles_to_templates(inventory)
-    ring_tmpls = roles_to_templates.get('swift-metadata', [])
-    objs = roles_to_templates.get('swift-object', [])
-    ring_tmpls.extend(objs)
+    for name, template in sorted((config.get('node-templates') or
+                                  {}).iteritems()):
+        if id(template) in ring_role_templates:
+            continue
+        domain_settings = template.get('domain-settings', {})
+        if not domain_settings:
+            continue
+        if md_rings.issubset(domain_settings.keys()):
+            msg = ('The node template %(template)s has account and container '
+                   'ring device lists but does not have the swift-metadata '
+                   'or swift-object role.')
+            _report(errors, UnsupportedConfig(
+                msg % {'template': name},
+                path=_template_path(name, 'domain-settings')))
+
+        if object_ring in domain_settings:
+            msg = ('The node template %(template)s has the object ring '
+                   'device list but does not have the swift-object role.')
+            _report(errors, UnsupportedConfig(
+                msg % {'template': name},
+                path=_template_path(name, 'domain-settings', object_ring)))
+
+
+def _has_converged_metadata_object(inventory, roles_to_templates=None):
+    if roles_to_templates is None:
+        roles_to_templates = _get_roles_to_templates(inventory)
+    # Build a new list; the lists in roles_to_templates are shared
+    ring_tmpls = (roles_to_templates.get('swift-metadata', []) +
+                  roles_to_templates.get('swift-object', []))
     required_props = {'account-ring-devices',
                       'container-ring-devices',
                       'object-ring-devices'}
@@ -276,8 +369,9 @@ def _has_converged_metadata_object(inventory):
     return True
 
 
-def _has_separate_metadata_object(inventory):
-    roles_to_templates = _get_roles_to_templates(inventory)
+def _has_separate_metadata_object(inventory, roles_to_templates=None):
+    if roles_to_templates is None:
+        roles_to_templates = _get_roles_to_templates(inventory)
     mds = roles_to_templates.get('swift-metadata', [])
     objs = roles_to_templates.get('swift-object', [])
 
@@ -303,17 +397,18 @@ def _has_separate_metadata_object(inventory):
     return True
 
 
-def validate_ceph(inventory):
+def validate_ceph(inventory, roles_to_templates=None, errors=None):
     reference_architecture = inventory.get('reference-architecture')
     if (CEPH not in reference_architecture and
             COMPUTE not in reference_architecture):
         # Nothing to validate.  No ref archs that use Ceph.
         return
 
-    roles_to_templates = _get_roles_to_templates(inventory)
+    if roles_to_templates is None:
+        roles_to_templates = _get_roles_to_templates(inventory)
     _validate_ceph_node_templates(roles_to_templates)
-    _validate_ceph_networks(inventory, roles_to_templates)
-    _validate_ceph_devices(inventory, roles_to_templates)
+    _validate_ceph_networks(inventory, roles_to_templates, errors=errors)
+    _validate_ceph_devices(inventory, roles_to_templates, errors=errors)
     _validate_ceph_mon_nodes(inventory, roles_to_templates)
 
 
@@ -340,7 +435,9 @@ def _get_node_template_names_for_role(inventory, role):
 
 def _validate_ceph_mon_nodes(inventory, roles_to_templates):
     mon_count = 0
+    path = NODES_PATH
     if not inventory.get('nodes', {}):
+        path = TEMPLATES_PATH
         for templ in roles_to_templates.get('ceph-monitor'):
             port_map = templ.get('ports', {})
             pxe_map = port_map.get('pxe', {})
@@ -356,7 +453,7 @@ def _validate_ceph_mon_nodes(inventory, roles_to_templates):
                "nodes.  Nodes under the 'controllers' node template or "
                "node templates with the 'ceph-monitor' role are "
                "Ceph monitors.")
-        raise UnsupportedConfig(msg)
+        raise UnsupportedConfig(msg, path=path)
 
 
 def _validate_ceph_node_templates(roles_to_templates):
@@ -364,16 +461,16 @@ def _validate_ceph_node_templates(roles_to_templates):
         msg = ('The configuration must either have a node template named '
                '\'controllers\' or one node template which has the '
                'ceph-monitor role.')
-        raise UnsupportedConfig(msg)
+        raise UnsupportedConfig(msg, path=TEMPLATES_PATH)
 
     if not roles_to_templates.get('ceph-osd'):
         msg = ('The configuration must either have a node template named '
                '\'ceph-osd\' or one node template which has the '
                'ceph-osd role.')
-        raise UnsupportedConfig(msg)
+        raise UnsupportedConfig(msg, path=TEMPLATES_PATH)
 
 
-def _validate_ceph_networks(config, roles_to_templates):
+def _validate_ceph_networks(config, roles_to_templates, errors=None):
     # Validate that the network used for Ceph public storage exists
     reference_architecture = config.get('reference-architecture')
     required_net = None
@@ -385,48 +482,61 @@ def _validate_ceph_networks(config, roles_to_templates):
     if required_net not in config.get('networks', []):
         msg = ('The required Ceph storage network %s is '
                'missing.' % required_net)
-        raise UnsupportedConfig(msg)
+        _report(errors, UnsupportedConfig(msg,
+                                          path='networks.' + required_net))
 
     # Validate that the ceph monitor node templates
     # have the network
-    if not _is_network_existing(roles_to_templates['ceph-monitor'],
-                                required_net):
-        msg = ('The ceph-monitor and/or controller node template(s)'
-               ' are missing network %(net)s')
-        raise UnsupportedConfig(msg % {'net': required_net})
+    msg = ('The ceph-monitor or controllers node template %(template)s is '
+           'missing network %(net)s')
+    _check_templates_network(config, roles_to_templates['ceph-monitor'],
+                             required_net, msg, errors)
     # Validate that the ceph osd node templates
     # have the network
-    if not _is_network_existing(roles_to_templates['ceph-osd'], required_net):
-        msg = ('The ceph osd node template(s) are missing network %(net)s')
-        raise UnsupportedConfig(msg % {'net': required_net})
+    msg = 'The ceph osd node template %(template)s is missing network %(net)s'
+    _check_templates_network(config, roles_to_templates['ceph-osd'],
+                             required_net, msg, errors)
 
 
-def _validate_ceph_devices(config, roles_to_templates):
+def _validate_ceph_devices(config, roles_to_templates, errors=None):
 
-    osd_templates = roles_to_templates.get('ceph-osd')
-    for template in osd_templates:
+    osd_templates = []
+    for name, template in _named_templates(
+            config, roles_to_templates.get('ceph-osd')):
         # Validate osd-devices is in domain-settings on the osd node template
         if not template.get('domain-settings', {}).get('osd-devices'):
-            msg = 'A Ceph OSD node template is missing the osd-devices list.'
-            raise UnsupportedConfig(msg)
+            msg = ('The Ceph OSD node template %(template)s is missing the '
+                   'osd-devices list.')
+            _report(errors, UnsupportedConfig(
+                msg % {'template': name},
+                path=_template_path(name, 'domain-settings', 'osd-devices')))
+        else:
+            osd_templates.append((name, template))
     if len(osd_templates) > 1:
         # Validate that the osd-device lists match between the templates
-        _validate_devices_lists(osd_templates, 'osd-devices')
+        _validate_devices_lists(osd_templates, 'osd-devices', errors)
 
         # If any node template has journal devices, validate that all have
         # journal devices.
         templates_with_journals = []
-        for template in osd_templates:
+        templates_without_journals = []
+        for name, template in osd_templates:
             if 'journal-devices' in template.get('domain-settings', {}):
-                templates_with_journals.append(template)
-        if templates_with_journals and (len(templates_with_journals) !=
-                                        len(osd_templates)):
-            msg = ('When one Ceph OSD node template is specifying journal '
-                   'devices, all Ceph OSD node templates must specify them.')
-            raise UnsupportedConfig(msg)
-
+                templates_with_journals.append((name, template))
+            else:
+                templates_without_journals.append(name)
         if templates_with_journals:
-            _validate_devices_lists(osd_templates, 'journal-devices')
+            for name in templates_without_journals:
+                msg = ('When one Ceph OSD node template is specifying journal '
+                       'devices, all Ceph OSD node templates must specify '
+                       'them.  The node template %(template)s does not.')
+                _report(errors, UnsupportedConfig(
+                    msg % {'template': name},
+                    path=_template_path(name, 'domain-settings',
+                                        'journal-devices')))
+
+            _validate_devices_lists(templates_with_journals,
+                                    'journal-devices', errors)
 
 
 def _get_roles_to_templates(config):
@@ -436,18 +546,22 @@ def _get_roles_to_templates(config):
     # Both 'controller' and 'controllers' can be keys in the resultant
     # dictionary roles_to_templates because 'controllers' is the old
     # node template name and 'controller' is the role name.
+    #
+    # The map is built once per validation and passed to the validators;
+    # they must not change it.  A template is listed once per role, which
+    # is tracked by (role, template id) rather than by comparing templates.
 
     def add_template(role, template, the_map):
-        templates = the_map.get(role)
-        if not templates:
-            templates = []
-            the_map[role] = templates
-        if template not in templates:
-            templates.append(template)
+        key = (role, id(template))
+        if key in added:
+            return
+        added.add(key)
+        the_map.setdefault(role, []).append(template)
     roles_to_templates = {}
+    added = set()
     if 'node-templates' not in config:
         msg = ('node-templates is missing in the configuration')
-        raise UnsupportedConfig(msg)
+        raise UnsupportedConfig(msg, path=TEMPLATES_PATH)
 
     for name, template in config['node-templates'].iteritems():
         # Add the template by name
@@ -463,52 +577,58 @@ def _get_roles_to_templates(config):
     return roles_to_templates
 
 
-def _validate_devices_lists(osd_templates, device_key):
+def _validate_devices_lists(osd_templates, device_key, errors=None):
     """
-    Validates the device lists on the OSD templates.
+    Validates the device lists on the OSD templates, given as
+    (name, template) pairs.
     The journal device lists must match across the templates.
     The osd device lists must match across the templates.
+    Each template whose list differs from the first one is reported.
     """
-
-    def checkEqual(iterator):
-        try:
-            iterator = iter(iterator)
-            first = next(iterator)
-            return all(first == rest for rest in iterator)
-        except StopIteration:
-            return True
-
-    are_equal = checkEqual(iter([tmpl['domain-settings'][device_key]
-                                 for tmpl in osd_templates]))
-    if not are_equal:
-        msg = ('The device list %(list_name)s does not contain the same '
-               'set of devices across all of '
-               'the OSD nodes.') % {'list_name': device_key}
-        raise InvalidDeviceList(msg)
-
-
-def validate_ops_mgr(config):
+    if not osd_templates:
+        return
+    first_name, first = osd_templates[0]
+    devices = first['domain-settings'][device_key]
+    for name, template in osd_templates[1:]:
+        if template['domain-settings'][device_key] != devices:
+            msg = ('The device list %(list_name)s of the node template '
+                   '%(template)s does not contain the same set of devices '
+                   'as the node template %(first)s.  It must be the same '
+                   'across all of the OSD nodes.')
+            _report(errors, InvalidDeviceList(
+                msg % {'list_name': device_key, 'template': name,
+                       'first': first_name},
+                path=_template_path(name, 'domain-settings', device_key)))
+
+
+def validate_ops_mgr(config, errors=None):
     # Require that every node-template be connected to the openstack-mgmt
     # network
     required_net = 'openstack-mgmt'
     if required_net not in config.get('networks', []):
         msg = ('The required openstack-mgmt network %s is '
                'missing.' % required_net)
-        raise UnsupportedConfig(msg)
+        _report(errors, UnsupportedConfig(msg,
+                                          path='networks.' + required_net))
 
     # validate that all the node templates have openstack-mgmt network
-    for template_name, template in config.get('node-templates').iteritems():
+    for template_name, template in sorted(config.get('node-templates',
+                                                     {}).iteritems()):
         nets = template.get('networks', [])
         if required_net not in nets:
             msg = 'The node template %(template)s is missing network %(net)s'
-            raise UnsupportedConfig(msg % {'template': template_name,
-                                           'net': required_net})
+            _report(errors, UnsupportedConfig(
+                msg % {'template': template_name, 'net': required_net},
+                path='%s.%s.networks' % (TEMPLATES_PATH, template_name)))
 
 
-def validate_propagation_roles(config):
+def validate_propagation_roles(config, roles_to_templates=None,
+                               errors=None):
     # Validate the solution_inventory and solution_keys file
     # propagation roles.
-    r2t = _get_roles_to_templates(config)
+    r2t = roles_to_templates
+    if r2t is None:
+        r2t = _get_roles_to_templates(config)
 
     if 'solution_keys' not in r2t or 'solution_inventory' not in r2t:
         # If the config has controllers but does not have the solution_keys
@@ -536,16 +656,278 @@ def validate_propagation_roles(config):
                    'solution_inventory roles. Please refer to the '
                    'config.yml files published with the latest version '
                    'of the reference design for role usage examples.')
-            raise UnsupportedConfig(msg)
+            _report(errors, UnsupportedConfig(msg, path=TEMPLATES_PATH))
+
+
+def validate_nodes(inventory, errors=None):
+    # Validate the nodes section of an inventory (a config has none): a
+    # host may be listed under several node templates, as in converged and
+    # all in one layouts, but must keep its management address wherever it
+    # is listed and be listed once per template; the addresses of a node
+    # must be within the CIDRs of their networks and its device lists must
+    # be well formed.  Each node is looked at once, using dicts of the
+    # values seen so far and a network index.
+    nodes = inventory.get('nodes')
+    if not nodes:
+        return
 
+    try:
+        networks = network_index.NetworkIndex(inventory.get('networks'))
+    except Exception as ex:
+        msg = 'A network has an invalid addr: %s' % ex
+        raise UnsupportedConfig(msg, path='networks')
+
+    hostnames = {}
+    mgmt_addrs = {}
+    for template_name in sorted(nodes):
+        for i, node in enumerate(nodes[template_name] or []):
+            path = '%s.%s.%d' % (NODES_PATH, template_name, i)
+            checks = ((_check_node_unique,
+                       (hostnames, node, 'hostname', MGMT_ADDR,
+                        template_name, path)),
+                      (_check_node_unique,
+                       (mgmt_addrs, node, MGMT_ADDR, 'hostname',
+                        template_name, path)),
+                      (_validate_node_addresses, (node, networks, path)),
+                      (_validate_node_devices, (node, path)))
+            for check, args in checks:
+                try:
+                    check(*args)
+                except ConfigError as ex:
+                    _report(errors, ex)
+
+
+def _check_node_unique(seen, node, key, other_key, template_name, path):
+    # seen maps the values of key to the other_key value, node template
+    # and path of the node they were first seen on.
+    value = node.get(key)
+    if not value:
+        return
+    other_value = node.get(other_key)
+    if value not in seen:
+        seen[value] = (other_value, template_name, path)
+        return
 
-def _load_yml(name):
-    with open(name, 'r') as stream:
+    seen_other_value, seen_template_name, seen_path = seen[value]
+    if seen_template_name == template_name:
+        msg = ('The %(key)s %(value)s of node %(path)s is also used by node '
+               '%(other)s of the same node template.')
+        raise UnsupportedConfig(msg % {'key': key, 'value': value,
+                                       'path': path, 'other': seen_path},
+                                path='%s.%s' % (path, key))
+    if other_value and seen_other_value and other_value != seen_other_value:
+        msg = ('The %(key)s %(value)s of node %(path)s is also used by node '
+               '%(other)s, which has a different %(other_key)s.')
+        raise UnsupportedConfig(msg % {'key': key, 'value': value,
+                                       'path': path, 'other': seen_path,
+                                       'other_key': other_key},
+                                path='%s.%s' % (path, key))
+
+
+def _validate_node_addresses(node, networks, path):
+    for key, addr in node.iteritems():
+        if not addr or not key.endswith(ADDR_SUFFIX):
+            continue
+        net = key[:-len(ADDR_SUFFIX)]
+        if net not in networks.cidrs:
+            continue
         try:
-            return yaml.safe_load(stream)
-        except yaml.YAMLError as ex:
-            print(ex)
-            sys.exit(1)
+            contained = networks.contains(net, addr)
+        except Exception:
+            contained = False
+        if not contained:
+            msg = ('The address %(addr)s of node %(path)s is not within the '
+                   '%(net)s network %(cidr)s.')
+            raise UnsupportedConfig(msg % {'addr': addr, 'path': path,
+                                           'net': net,
+                                           'cidr': networks.cidrs[net]},
+                                    path='%s.%s' % (path, key))
+
+
+def _validate_node_devices(node, path):
+    lists = {}
+    for settings, settings_path in ((node, path),
+                                    (node.get('domain-settings') or {},
+                                     path + '.domain-settings')):
+        for key in CEPH_DEVICE_LISTS + SWIFT_DEVICE_LISTS:
+            if key not in settings:
+                continue
+            devices = settings[key]
+            list_path = '%s.%s' % (settings_path, key)
+            if (not isinstance(devices, list) or
+                    not all(devices) or
+                    not all(isinstance(dev, basestring) for dev in devices)):
+                msg = ('The device list %(key)s of node %(path)s must be a '
+                       'list of device names.')
+                raise InvalidDeviceList(msg % {'key': key, 'path': path},
+                                        path=list_path)
+            if len(set(devices)) != len(devices):
+                msg = ('The device list %(key)s of node %(path)s lists a '
+                       'device more than once.')
+                raise InvalidDeviceList(msg % {'key': key, 'path': path},
+                                        path=list_path)
+            lists[key] = (devices, list_path)
+
+    # A Ceph journal device can't also be an OSD
+    if 'osd-devices' in lists and 'journal-devices' in lists:
+        shared = (set(lists['osd-devices'][0]) &
+                  set(lists['journal-devices'][0]))
+        if shared:
+            msg = ('The devices %(devs)s of node %(path)s are in both the '
+                   'osd-devices and journal-devices lists.')
+            raise InvalidDeviceList(msg % {'devs': ', '.join(sorted(shared)),
+                                           'path': path},
+                                    path=lists['journal-devices'][1])
+
+
+# The rule groups checked by validate_all, in the order they are reported:
+# (group name, validator name, whether the validator takes the roles to
+# templates map, whether it relies on a valid reference architecture).
+REF_ARCH_GROUP = 'reference-architecture'
+RULE_GROUPS = (
+    (REF_ARCH_GROUP, 'validate_reference_architecture', False, False),
+    ('private-compute-cloud', 'validate_private_compute_cloud', True, True),
+    ('swift', 'validate_swift', True, True),
+    ('ceph', 'validate_ceph', True, True),
+    ('ops-mgr', 'validate_ops_mgr', False, False),
+    ('propagation-roles', 'validate_propagation_roles', True, False),
+    ('nodes', 'validate_nodes', False, False),
+)
+
+# The validators which report every violation they find when given a list
+# to collect them in, rather than stopping at the first one
+COLLECTING_VALIDATORS = {'validate_private_compute_cloud', 'validate_swift',
+                         'validate_ceph', 'validate_ops_mgr',
+                         'validate_propagation_roles', 'validate_nodes'}
+
+# The config being checked by validate_all.  Rule group workers inherit it
+# when the pool forks rather than having it sent to them.
+_check_state = {}
+
+
+def _violation(group, ex):
+    return {'group': group,
+            'error': type(ex).__name__,
+            'message': str(ex),
+            'path': getattr(ex, 'path', None)}
+
+
+def _check_rule_group(group):
+    # Run the validator of one rule group, returning its violations.  The
+    # collecting validators report a violation for each node template,
+    # network or node in turn; checks which later checks build on, such as
+    # the reference architecture, still stop at their first violation.
+    for name, validator_name, uses_roles, _ in RULE_GROUPS:
+        if name == group:
+            break
+    validator = globals()[validator_name]
+    args = [_check_state['inventory']]
+    if uses_roles:
+        args.append(_check_state['roles_to_templates'])
+    errors = []
+    kwargs = {}
+    if validator_name in COLLECTING_VALIDATORS:
+        kwargs['errors'] = errors
+    try:
+        validator(*args, **kwargs)
+    except Exception as ex:
+        errors.append(ex)
+    return [_violation(group, error) for error in errors]
+
+
+def validate_all(inventory, jobs=1):
+    """Check all the rule groups, rather than stopping at the first error.
+
+    The groups which rely on the reference architecture are skipped when
+    it isn't valid, and those which need the node templates when there are
+    none.
+
+    :param inventory: The config or inventory to validate.
+    :param jobs: The number of processes the rule groups are checked in.
+    :returns: A list of violations, dicts with the rule group, the error
+              (exception) name, message and, when known, the path of the
+              offending config item.
+    """
+    violations = []
+    try:
+        roles_to_templates = _get_roles_to_templates(inventory)
+    except UnsupportedConfig as ex:
+        # Without node templates only the groups which don't look at them
+        # can be checked
+        violations.append(_violation(TEMPLATES_PATH, ex))
+        roles_to_templates = None
+
+    _check_state.update(inventory=inventory,
+                        roles_to_templates=roles_to_templates)
+    try:
+        # The reference architecture is checked first: the groups which
+        # rely on it are skipped when it isn't valid, rather than
+        # reporting errors which follow from it.
+        results = [_check_rule_group(REF_ARCH_GROUP)]
+        ref_arch_valid = not results[0]
+        groups = [name for name, _, uses_roles, uses_ref_arch in RULE_GROUPS
+                  if name != REF_ARCH_GROUP and
+                  (roles_to_templates is not None or not uses_roles) and
+                  (ref_arch_valid or not uses_ref_arch)]
+        if jobs > 1 and len(groups) > 1:
+            import multiprocessing
+
+            pool = multiprocessing.Pool(min(jobs, len(groups)))
+            try:
+                results.extend(pool.map(_check_rule_group, groups))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results.extend(_check_rule_group(group) for group in groups)
+    finally:
+        _check_state.clear()
+
+    for result in results:
+        violations.extend(result)
+    return violations
+
+
+def report_all(file_path, jobs=1, as_json=False):
+    # Validate the file with validate_all and print all the violations,
+    # as text or as a JSON document.  Returns the number of violations.
+    try:
+        inventory = inventory_loader.load_file(file_path)
+    except Exception as ex:
+        violations = [_violation('load', ex)]
+    else:
+        # Keep the JSON document alone on stdout; validators print warnings
+        stdout = sys.stdout
+        if as_json:
+            sys.stdout = sys.stderr
+        try:
+            violations = validate_all(inventory, jobs)
+        finally:
+            sys.stdout = stdout
+
+    if as_json:
+        print json.dumps({'file': file_path,
+                          'valid': not violations,
+                          'violations': violations},
+                         indent=4, sort_keys=True)
+    else:
+        for violation in violations:
+            where = ''
+            if violation['path']:
+                where = ' (%s)' % violation['path']
+            print '%s: %s%s' % (violation['group'], violation['message'],
+                                where)
+    return len(violations)
+
+
+def _load_yml(name):
+    # yaml is only imported by the loader when the file isn't cached, so
+    # parse errors (yaml.YAMLError) are caught with the I/O errors.
+    try:
+        return inventory_loader.load_file(name)
+    except Exception as ex:
+        print(ex)
+        sys.exit(1)
 
 
 def main():
@@ -560,13 +942,36 @@ def main():
                         required=True,
                         help='The path to the config or inventory file.')
 
+    parser.add_argument('--all',
+                        dest='all',
+                        action='store_true',
+                        help='Report all the violations found rather than '
+                             'stopping at the first one.')
+
+    parser.add_argument('--json',
+                        dest='json',
+                        action='store_true',
+                        help='Report all the violations found as a JSON '
+                             'document (implies --all).')
+
+    parser.add_argument('-j', '--jobs',
+                        dest='jobs',
+                        type=int,
+                        default=1,
+                        help='The number of processes to check the rule '
+                             'groups in with --all or --json.')
+
     # Handle error cases before attempting to parse
     # a command off the command line
     if len(sys.argv) == 1:
         parser.print_help()
         sys.exit(1)
     args = parser.parse_args()
-    validate(args.file)
+    if args.all or args.json:
+        if report_all(args.file, args.jobs, args.json):
+            sys.exit(1)
+    else:
+        validate(args.file)
 
 if __name__ == "__main__":
     main()
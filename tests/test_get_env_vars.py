@@ -16,7 +16,11 @@
 
 import os
 from os import path
+import shutil
+import subprocess
 import sys
+import tempfile
+import time
 
 import mock
 import unittest
@@ -80,3 +84,53 @@ class TestGetEnvVars(unittest.TestCase):
         mock_load.return_value = {}
         gev.process_inventory('inventory_file_name')
         mock_load.assert_called_once_with('inventory_file_name')
+
+
+class TestStartup(unittest.TestCase):
+    """get_env_vars.py is run from shell loops, so its startup must be fast.
+
+    The budget is on top of the startup time of the bare interpreter, and
+    can be raised for slow machines with GET_ENV_VARS_STARTUP_BUDGET_MS.
+    """
+
+    BUDGET_MS = int(os.environ.get('GET_ENV_VARS_STARTUP_BUDGET_MS', 50))
+    RUNS = 5
+
+    def setUp(self):
+        super(TestStartup, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.inv_name = path.join(self.tmp_dir, 'inventory.yml')
+        with open(self.inv_name, 'w') as stream:
+            stream.write('internal-floating-ipaddr: 172.29.236.50\n'
+                         'deployment-environment:\n'
+                         '  no_proxy: localhost\n')
+        self.script = path.join(TOP_DIR, SCRIPT_DIR, 'get_env_vars.py')
+
+    def _run(self, *args):
+        with open(os.devnull, 'w') as devnull:
+            start = time.time()
+            subprocess.check_call((sys.executable,) + args, stdout=devnull)
+            return time.time() - start
+
+    def _best_time(self, *args):
+        return min(self._run(*args) for _ in range(self.RUNS))
+
+    def test_cached_run_skips_heavy_imports(self):
+        # The first run parses the inventory and writes its cache
+        self._run(self.script, '-i', self.inv_name)
+        check = ("import sys; sys.path.insert(0, %r); "
+                 "sys.argv = ['get_env_vars.py', '-i', %r]; "
+                 "import get_env_vars; get_env_vars.main(); "
+                 "assert 'yaml' not in sys.modules, 'yaml imported'; "
+                 "assert 'netaddr' not in sys.modules, 'netaddr imported'"
+                 % (path.join(TOP_DIR, SCRIPT_DIR), self.inv_name))
+        self._run('-c', check)
+
+    def test_startup_budget(self):
+        self._run(self.script, '-i', self.inv_name)
+        bare = self._best_time('-c', 'pass')
+        elapsed = self._best_time(self.script, '-i', self.inv_name)
+        self.assertLess((elapsed - bare) * 1000, self.BUDGET_MS,
+                        'get_env_vars.py took %dms (interpreter %dms)' %
+                        (elapsed * 1000, bare * 1000))
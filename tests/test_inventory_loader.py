@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+#
+# Copyright 2017 IBM US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from os import path
+import shutil
+from StringIO import StringIO
+import sys
+import tempfile
+import time
+
+import mock
+import unittest
+import yaml
+
+TOP_DIR = path.join(os.getcwd(), path.dirname(__file__), '..')
+SCRIPT_DIR = 'osa/scripts'
+sys.path.append(path.join(TOP_DIR, SCRIPT_DIR))
+
+import inventory_loader as il
+
+
+class TestInventoryLoader(unittest.TestCase):
+
+    def setUp(self):
+        super(TestInventoryLoader, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.inv_name = path.join(self.tmp_dir, 'inventory.yml')
+        self._write('nodes:\n  controllers:\n  - hostname: c1\n')
+
+    def _write(self, contents, mtime=None):
+        with open(self.inv_name, 'w') as stream:
+            stream.write(contents)
+        if mtime is not None:
+            os.utime(self.inv_name, (mtime, mtime))
+
+    def test_cache_path(self):
+        self.assertEqual('/var/oprc/.inventory.yml.cache',
+                         il.cache_path('/var/oprc/inventory.yml'))
+
+    def test_load_stream(self):
+        self.assertEqual({'a': [1, 2]}, il.load(StringIO('a: [1, 2]')))
+
+    def test_load_invalid(self):
+        self._write('nodes: host1: key: value')
+        self.assertRaises(yaml.YAMLError, il.load_file, self.inv_name)
+        self.assertFalse(path.exists(il.cache_path(self.inv_name)))
+
+    def test_load_file_creates_cache(self):
+        expected = {'nodes': {'controllers': [{'hostname': 'c1'}]}}
+        self.assertEqual(expected, il.load_file(self.inv_name))
+        self.assertTrue(path.exists(il.cache_path(self.inv_name)))
+        self.assertEqual(['.inventory.yml.cache', 'inventory.yml'],
+                         sorted(os.listdir(self.tmp_dir)))
+
+        # The second load is answered from the cache
+        with mock.patch.object(yaml, 'load') as mock_load:
+            self.assertEqual(expected, il.load_file(self.inv_name))
+        self.assertFalse(mock_load.called)
+
+    def test_loads_are_independent(self):
+        il.load_file(self.inv_name)
+        data = il.load_file(self.inv_name)
+        data['nodes']['controllers'].append({'hostname': 'c2'})
+        self.assertEqual(1, len(il.load_file(self.inv_name)['nodes']
+                                ['controllers']))
+
+    def test_changed_file_reparsed(self):
+        il.load_file(self.inv_name)
+        self._write('nodes: {}\n', mtime=1)
+        self.assertEqual({'nodes': {}}, il.load_file(self.inv_name))
+
+    def test_touched_file_uses_hash(self):
+        self._write('nodes: {}\n', mtime=1)
+        il.load_file(self.inv_name)
+
+        # Same contents, new modification time
+        self._write('nodes: {}\n', mtime=2)
+        with mock.patch.object(yaml, 'load') as mock_load:
+            self.assertEqual({'nodes': {}}, il.load_file(self.inv_name))
+        self.assertFalse(mock_load.called)
+
+    def test_unchanged_file_not_hashed(self):
+        self._write('nodes: {}\n', mtime=1)
+        il.load_file(self.inv_name)
+        with mock.patch.object(il.hashlib, 'sha1') as mock_sha1:
+            self.assertEqual({'nodes': {}}, il.load_file(self.inv_name))
+        self.assertFalse(mock_sha1.called)
+
+    def test_rewrite_within_mtime_resolution(self):
+        # A rewrite of the same size which keeps the modification time is
+        # found by the hash while the cache is newer than the file by less
+        # than the filesystem's timestamp resolution
+        mtime = time.time()
+        self._write('nodes: {a: 1}\n', mtime=mtime)
+        self.assertEqual({'nodes': {'a': 1}}, il.load_file(self.inv_name))
+        self._write('nodes: {b: 2}\n', mtime=mtime)
+        self.assertEqual({'nodes': {'b': 2}}, il.load_file(self.inv_name))
+
+    def test_cache_not_owned_ignored(self):
+        il.load_file(self.inv_name)
+        with mock.patch.object(il.os, 'geteuid', return_value=-1):
+            with mock.patch.object(yaml, 'load',
+                                   return_value='parsed') as mock_load:
+                self.assertEqual('parsed', il.load_file(self.inv_name))
+        self.assertTrue(mock_load.called)
+
+    def test_corrupt_cache_ignored(self):
+        with open(il.cache_path(self.inv_name), 'w') as stream:
+            stream.write('not a pickle')
+        self.assertEqual({'nodes': {'controllers': [{'hostname': 'c1'}]}},
+                         il.load_file(self.inv_name))
+
+    def test_unwritable_directory(self):
+        with mock.patch.object(il.tempfile, 'mkstemp', side_effect=OSError):
+            self.assertEqual({'nodes': {'controllers': [{'hostname': 'c1'}]}},
+                             il.load_file(self.inv_name))
+        self.assertFalse(path.exists(il.cache_path(self.inv_name)))
+
+
+if __name__ == '__main__':
+    unittest.main()
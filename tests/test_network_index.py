@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+# Copyright 2017 IBM US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import os
+from os import path
+import sys
+
+import netaddr
+import unittest
+
+TOP_DIR = path.join(os.getcwd(), path.dirname(__file__), '..')
+SCRIPT_DIR = 'osa/scripts'
+sys.path.append(path.join(TOP_DIR, SCRIPT_DIR))
+
+import network_index
+
+
+class TestNetworkIndex(unittest.TestCase):
+
+    def setUp(self):
+        super(TestNetworkIndex, self).setUp()
+        self.networks = collections.OrderedDict([
+            ('openstack-mgmt', {'addr': '10.0.0.0/8', 'bridge': 'br-mgmt'}),
+            ('openstack-stg', {'addr': '10.1.0.0/16'}),
+            ('external1', {'addr': '10.1.2.0/24'}),
+            ('external2', {'addr': '10.1.2.0/24'}),
+            ('openstack-tenant-vxlan', {'addr': '172.16.0.0/12'}),
+            ('openstack-tenant-vlan', {'bridge': 'br-vlan'}),
+            ('v6', {'addr': 'fd00::/64'}),
+        ])
+        self.index = network_index.NetworkIndex(self.networks)
+
+    def test_longest_prefix_match(self):
+        self.assertEqual('openstack-mgmt', self.index.find('10.0.0.1'))
+        self.assertEqual('openstack-mgmt', self.index.find('10.255.0.1'))
+        self.assertEqual('openstack-stg', self.index.find('10.1.0.1'))
+        self.assertEqual('openstack-stg', self.index.find('10.1.3.0'))
+        self.assertEqual('openstack-tenant-vxlan',
+                         self.index.find('172.31.255.255'))
+
+    def test_identical_cidrs_first_listed_wins(self):
+        self.assertEqual('external1', self.index.find('10.1.2.255'))
+
+    def test_address_with_prefix(self):
+        self.assertEqual('external1', self.index.find('10.1.2.3/22'))
+
+    def test_not_found(self):
+        self.assertIsNone(self.index.find('9.255.255.255'))
+        self.assertIsNone(self.index.find('11.0.0.0'))
+        self.assertIsNone(self.index.find('172.32.0.0'))
+        self.assertIsNone(network_index.NetworkIndex({}).find('10.0.0.1'))
+
+    def test_ipv6(self):
+        self.assertEqual('v6', self.index.find('fd00::1'))
+        self.assertIsNone(self.index.find('fd01::1'))
+
+    def test_contains(self):
+        self.assertTrue(self.index.contains('openstack-stg', '10.1.2.3'))
+        self.assertFalse(self.index.contains('openstack-stg', '10.2.0.1'))
+        self.assertFalse(self.index.contains('openstack-tenant-vlan',
+                                             '10.1.2.3'))
+        self.assertFalse(self.index.contains('missing', '10.1.2.3'))
+
+    def test_invalid(self):
+        self.assertRaises(netaddr.AddrFormatError, self.index.find, 'N/A')
+        self.assertRaises(netaddr.AddrFormatError,
+                          network_index.NetworkIndex,
+                          {'bad': {'addr': 'not-a-cidr'}})
+
+    def test_matches_linear_scan(self):
+        # Compare with checking every network, most specific first
+        for addr in ('10.0.0.0', '10.1.0.0', '10.1.1.255', '10.1.2.0',
+                     '10.1.255.255', '10.2.0.0', '172.16.0.0', '1.1.1.1'):
+            ip = netaddr.IPAddress(addr)
+            matches = [(-netaddr.IPNetwork(d['addr']).prefixlen, i, name)
+                       for i, (name, d) in enumerate(self.networks.items())
+                       if 'addr' in d and
+                       ip in netaddr.IPNetwork(d['addr'])]
+            expected = min(matches)[2] if matches else None
+            self.assertEqual(expected, self.index.find(addr))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#
+# Copyright 2017 IBM US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+from os import path
+import shutil
+import sys
+import tempfile
+
+import unittest
+
+TOP_DIR = path.join(os.getcwd(), path.dirname(__file__), '..')
+SCRIPT_DIR = 'osa/scripts'
+sys.path.append(path.join(TOP_DIR, SCRIPT_DIR))
+
+import swift_device_lists as sdl
+
+
+class TestSwiftDeviceLists(unittest.TestCase):
+
+    def test_check_device_lists_equal(self):
+        disks = ['sdb', 'sdc']
+        violations, matches = sdl.check_device_lists(
+            {'account': disks, 'container': disks, 'object': disks})
+        self.assertEqual([], violations)
+        self.assertTrue(matches)
+
+    def test_check_device_lists_exclusive(self):
+        violations, matches = sdl.check_device_lists(
+            {'account': ['sdb'], 'container': ['sdb'], 'object': ['sdc']})
+        self.assertEqual([], violations)
+        self.assertFalse(matches)
+
+    def test_check_device_lists_account_container_differ(self):
+        violations, matches = sdl.check_device_lists(
+            {'account': ['sdb'], 'container': ['sdc']})
+        self.assertEqual(1, len(violations))
+        self.assertIn('sdb, sdc', violations[0])
+
+    def test_check_device_lists_partial_overlap(self):
+        violations, matches = sdl.check_device_lists(
+            {'account': ['sdb', 'sdc'], 'container': ['sdb', 'sdc'],
+             'object': ['sdc', 'sdd']})
+        self.assertEqual(1, len(violations))
+        self.assertIn('mutually exclusive', violations[0])
+        self.assertFalse(matches)
+
+    def test_get_inventory_device_lists(self):
+        inventory = {
+            'node-templates': {
+                'swift': {
+                    'domain-settings': {
+                        'account-ring-devices': ['sdb'],
+                        'object-ring-devices': ['sdc']}}},
+            'nodes': {
+                'swift': [
+                    {'ipv4-pxe': '10.0.0.1', 'template': 'swift'},
+                    {'ipv4-pxe': '10.0.0.2', 'template': 'swift',
+                     'domain-settings': {
+                         'object-ring-devices': ['sdd']}}],
+                'controller': [
+                    {'ipv4-pxe': '10.0.0.3', 'template': 'controller'}]}}
+        host_lists = sdl.get_inventory_device_lists(inventory)
+        self.assertEqual(
+            {'10.0.0.1': {'account': ['sdb'], 'object': ['sdc']},
+             '10.0.0.2': {'account': ['sdb'], 'object': ['sdd']}},
+            host_lists)
+
+    def test_read_manifest(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        manifest = path.join(tmp_dir, 'output.diskprep.manifest')
+        with open(manifest, 'w') as stream:
+            for ring, device in (('account', 'sdb'), ('container', 'sdb'),
+                                 ('object', 'sdc'), ('object', 'sdd')):
+                stream.write(json.dumps({'ring': ring, 'device': device,
+                                         'status': 'ready'}) + '\n')
+            stream.write('\n')
+        self.assertEqual(
+            {'account': ['sdb'], 'container': ['sdb'],
+             'object': ['sdc', 'sdd']},
+            sdl.read_manifest(manifest))
+
+    def test_validate_hosts(self):
+        results = sdl.validate_hosts({
+            'host1': {'account': ['sdb'], 'container': ['sdb'],
+                      'object': ['sdb']},
+            'host2': {'account': ['sdb'], 'container': ['sdc']}})
+        self.assertEqual([], results['host1']['violations'])
+        self.assertTrue(results['host1']['account_matches_object'])
+        self.assertEqual(1, len(results['host2']['violations']))
+        self.assertFalse(results['host2']['account_matches_object'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+#
+# Copyright 2017 IBM US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import fcntl
+import json
+import os
+from os import path
+import shutil
+from StringIO import StringIO
+import sys
+import tempfile
+
+import mock
+import unittest
+import yaml
+
+TOP_DIR = path.join(os.getcwd(), path.dirname(__file__), '..')
+SCRIPT_DIR = 'osa/playbooks/roles/swift_hosts/files'
+sys.path.append(path.join(TOP_DIR, SCRIPT_DIR))
+
+import swift_update_disk_lists as sudl
+
+
+class TestSwiftUpdateDiskLists(unittest.TestCase):
+
+    def setUp(self):
+        super(TestSwiftUpdateDiskLists, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.inv_name = path.join(self.tmp_dir, 'inventory.yml')
+        self.patch_name = path.join(self.tmp_dir, 'patch.json')
+        with open(self.inv_name, 'w') as stream:
+            yaml.safe_dump(self._inventory(), stream,
+                           default_flow_style=False)
+
+    def _inventory(self):
+        return {
+            'nodes': {
+                'swift-metadata': [
+                    {'ipv4-pxe': '10.0.0.1'}],
+                'swift-object': [
+                    {'ipv4-pxe': '10.0.0.2',
+                     'domain-settings': {'object-ring-disks': ['disk1']}},
+                    {'ipv4-pxe': '10.0.0.3',
+                     'domain-settings': {'object-ring-disks': ['disk1']}}]}}
+
+    def _write_file(self, name, lines):
+        file_name = path.join(self.tmp_dir, name)
+        with open(file_name, 'w') as stream:
+            stream.write(''.join(line + '\n' for line in lines))
+        return file_name
+
+    def _read_yml(self):
+        with open(self.inv_name) as stream:
+            return yaml.safe_load(stream)
+
+    def _read_patch(self):
+        with open(self.patch_name) as stream:
+            return json.load(stream)
+
+    def test_json_pointer(self):
+        self.assertEqual('/nodes/swift-object/0',
+                         sudl.json_pointer('nodes', 'swift-object', 0))
+        self.assertEqual('/a~1b/c~0d', sudl.json_pointer('a/b', 'c~d'))
+        self.assertEqual('/~01', sudl.json_pointer('~1'))
+
+    def test_parse_update(self):
+        self.assertEqual(('10.0.0.1', 'account', '/tmp/a:b'),
+                         sudl.parse_update('10.0.0.1:account:/tmp/a:b'))
+        self.assertRaises(argparse.ArgumentTypeError,
+                          sudl.parse_update, '10.0.0.1:account')
+        self.assertRaises(argparse.ArgumentTypeError,
+                          sudl.parse_update, '10.0.0.1:proxy:/tmp/a')
+
+    def test_parse_manifest(self):
+        self.assertEqual(('10.0.0.1', '/tmp/manifest'),
+                         sudl.parse_manifest('10.0.0.1:/tmp/manifest'))
+        self.assertRaises(argparse.ArgumentTypeError,
+                          sudl.parse_manifest, '/tmp/manifest')
+
+    def test_process_batch(self):
+        meta = self._write_file('meta', ['disk2', 'disk3'])
+        obj = self._write_file('obj', ['disk4'])
+        same = self._write_file('same', ['disk1'])
+        sudl.process_batch(self.inv_name, self.inv_name,
+                           [('10.0.0.1', 'account', meta),
+                            ('10.0.0.1', 'container', meta),
+                            ('10.0.0.2', 'object', obj),
+                            ('10.0.0.2', 'account', meta),
+                            ('10.0.0.3', 'object', same)],
+                           patch_file=self.patch_name)
+
+        expected = self._inventory()
+        nodes = expected['nodes']
+        nodes['swift-metadata'][0]['domain-settings'] = {
+            'account-ring-disks': ['disk2', 'disk3'],
+            'container-ring-disks': ['disk2', 'disk3']}
+        nodes['swift-object'][0]['domain-settings'] = {
+            'object-ring-disks': ['disk4'],
+            'account-ring-disks': ['disk2', 'disk3']}
+        self.assertEqual(expected, self._read_yml())
+
+        # A host without domain-settings gets them all at once, existing
+        # lists are replaced and unchanged lists aren't in the patch
+        self.assertEqual(
+            [{'op': 'add',
+              'path': '/nodes/swift-metadata/0/domain-settings',
+              'value': {'account-ring-disks': ['disk2', 'disk3']}},
+             {'op': 'add',
+              'path': ('/nodes/swift-metadata/0/domain-settings/'
+                       'container-ring-disks'),
+              'value': ['disk2', 'disk3']},
+             {'op': 'replace',
+              'path': ('/nodes/swift-object/0/domain-settings/'
+                       'object-ring-disks'),
+              'value': ['disk4']},
+             {'op': 'add',
+              'path': ('/nodes/swift-object/0/domain-settings/'
+                       'account-ring-disks'),
+              'value': ['disk2', 'disk3']}],
+            self._read_patch())
+
+    def test_process_batch_manifest(self):
+        manifest = self._write_file('manifest', [
+            json.dumps({'ring': 'object', 'device': 'sdb',
+                        'label': 'disk5', 'status': 'ready'}),
+            json.dumps({'ring': 'object', 'device': 'sdc',
+                        'label': 'disk6', 'status': 'formatted'}),
+            ''])
+        sudl.process_batch(self.inv_name, self.inv_name, [],
+                           manifests=[('10.0.0.3', manifest)])
+        ds = self._read_yml()['nodes']['swift-object'][1]['domain-settings']
+        self.assertEqual({'object-ring-disks': ['disk5', 'disk6']}, ds)
+
+    def test_process_batch_missing_host(self):
+        with open(self.inv_name) as stream:
+            before = stream.read()
+        obj = self._write_file('obj', ['disk4'])
+        with mock.patch.object(sys, 'stdout', StringIO()):
+            self.assertRaises(SystemExit, sudl.process_batch,
+                              self.inv_name, self.inv_name,
+                              [('10.0.0.2', 'object', obj),
+                               ('10.0.0.9', 'object', obj)],
+                              patch_file=self.patch_name)
+        with open(self.inv_name) as stream:
+            self.assertEqual(before, stream.read())
+        self.assertFalse(path.exists(self.patch_name))
+
+    def test_write_yml(self):
+        os.chmod(self.inv_name, 0o640)
+        sudl.SwiftDiskPrep._write_yml(self.inv_name, {'nodes': {}})
+        self.assertEqual({'nodes': {}}, self._read_yml())
+        self.assertEqual(0o640, os.stat(self.inv_name).st_mode & 0o7777)
+
+        # A failed write leaves the inventory and no temporary file behind
+        with mock.patch.object(sudl.yaml, 'dump', side_effect=IOError):
+            self.assertRaises(IOError, sudl.SwiftDiskPrep._write_yml,
+                              self.inv_name, {'nodes': None})
+        self.assertEqual({'nodes': {}}, self._read_yml())
+        self.assertEqual(['inventory.yml'], os.listdir(self.tmp_dir))
+
+    def test_inventory_lock(self):
+        lock_name = path.join(self.tmp_dir, '.inventory.yml.lock')
+        with sudl.inventory_lock(self.inv_name):
+            with open(lock_name) as lock_file:
+                self.assertRaises(IOError, fcntl.flock, lock_file,
+                                  fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with open(lock_name) as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,7 +17,9 @@
 import copy
 import os
 from os import path
+import shutil
 import sys
+import tempfile
 
 import mock
 import unittest
@@ -240,9 +242,30 @@ class TestOFGBasics(unittest.TestCase):
             ofg._dump_yml(data, 'filename')
 
         mock_open.assert_called_once_with('output-dir/filename', 'w')
-        mock_dump.assert_called_once_with(data, m(), default_flow_style=False,
+        mock_dump.assert_called_once_with(data, m(), Dumper=guc._Dumper,
+                                          default_flow_style=False,
                                           explicit_start=True)
 
+    def test__dump_yml_shared_entries(self):
+        # Entries shared between groups are written out in full each time,
+        # exactly as the pure python dumper writes separate copies.
+        ofg = guc.OSAFileGenerator('input-file', 'output-dir')
+        host = {'ip': '1.2.3.4'}
+        data = {'a_hosts': {'h1': host}, 'b_hosts': {'h1': host}}
+        open_name = 'generate_user_config.open'
+        m = mock.mock_open()
+        with mock.patch(open_name, m, create=True):
+            ofg._dump_yml(data, 'filename')
+
+        written = ''.join(call[0][0] for call in m().write.call_args_list)
+        self.assertNotIn('&', written)
+        copied = {'a_hosts': {'h1': {'ip': '1.2.3.4'}},
+                  'b_hosts': {'h1': {'ip': '1.2.3.4'}}}
+        self.assertEqual(yaml.dump(copied, explicit_start=True,
+                                   default_flow_style=False,
+                                   Dumper=yaml.Dumper),
+                         written)
+
     @mock.patch.object(yaml, 'dump')
     def test__dump_yml_with_exception(self, mock_dump):
         ofg = guc.OSAFileGenerator('input-file', 'output-dir')
@@ -319,6 +342,57 @@ class TestOFGBasics(unittest.TestCase):
         ret = ofg._get_nodes_for_role('mytype')
         self.assertItemsEqual(['n1', 'n2', 'n3', 'n4'], ret)
 
+    def test_get_nodes_for_role_dedupes_by_hostname(self):
+        ofg = guc.OSAFileGenerator('input-file', 'output-dir')
+
+        # The same host listed under two templates with the role, and
+        # under the template named after the role, is returned once.
+        inv = {'nodes': {'ceph-monitor': [{'hostname': 'h1', 'x': 1}],
+                         'mon1': [{'hostname': 'h1', 'x': 2},
+                                  {'hostname': 'h2'}],
+                         'mon2': [{'hostname': 'h2'},
+                                  {'hostname': 'h3'}]},
+               'node-templates': {'mon1': {'roles': ['ceph-monitor']},
+                                  'mon2': {'roles': ['ceph-monitor']}}}
+        ofg.gen_dict = inv
+        ret = ofg._get_nodes_for_role('ceph-monitor')
+        self.assertEqual(['h1', 'h2', 'h3'],
+                         [node['hostname'] for node in ret])
+        self.assertEqual(1, ret[0]['x'])
+        self.assertEqual(3, len(ofg._get_ceph_monitors()))
+
+        # Callers may change the returned lists without affecting the index
+        ret.append({'hostname': 'h4'})
+        self.assertEqual(3, len(ofg._get_nodes_through_roles('ceph-monitor')))
+
+    def test_role_index(self):
+        ofg = guc.OSAFileGenerator('input-file', 'output-dir')
+        open_name = 'generate_user_config.open'
+        m = mock.mock_open(read_data=(
+            'node-templates:\n'
+            '  ctrl:\n'
+            '    roles: [controller, ceph-monitor]\n'
+            'nodes:\n'
+            '  ctrl:\n'
+            '    - hostname: c1\n'))
+        with mock.patch(open_name, m, create=True):
+            ofg._load_yml()
+
+        # The index is built when the inventory is loaded
+        self.assertItemsEqual(['controller', 'ceph-monitor'],
+                              ofg._role_index.keys())
+        index = ofg._role_index
+        ofg._get_controllers()
+        ofg._get_nodes_for_role('ceph-monitor')
+        self.assertIs(index, ofg._role_index)
+
+        # and rebuilt when gen_dict is replaced
+        ofg.gen_dict = {'nodes': {'other': [{'hostname': 'o1'}]},
+                        'node-templates': {'other': {'roles': ['compute']}}}
+        ret = ofg._get_nodes_for_role('compute')
+        self.assertEqual([{'hostname': 'o1'}], ret)
+        self.assertEqual([], ofg._get_controllers())
+
 
 class TestCIDRNetworks(unittest.TestCase):
     def setUp(self):
@@ -1075,6 +1149,27 @@ class TestConfigureGlobalOverrides(unittest.TestCase):
                                                           networks)
         self.assertEqual('openstack-mgmt', net)
 
+    def test_find_external_network_most_specific(self):
+        networks = {
+            'openstack-mgmt': {
+                'addr': '22.33.0.0/16',
+            },
+            'external1': {
+                'addr': '22.33.44.0/22',
+            },
+        }
+
+        net, net_details = self.ofg.find_external_network('22.33.44.55',
+                                                          networks)
+        self.assertEqual('external1', net)
+        self.assertIs(networks['external1'], net_details)
+        index = self.ofg.get_network_index(networks)
+        net, net_details = self.ofg.find_external_network('22.33.4.5',
+                                                          networks)
+        self.assertEqual('openstack-mgmt', net)
+        # The index is reused for the same networks
+        self.assertIs(index, self.ofg.get_network_index(networks))
+
     def test_single_controller(self):
         self.ofg.gen_dict = {
             'internal-floating-ipaddr': '11.22.33.44/22',
@@ -2911,5 +3006,204 @@ class TestConfigureSwift(unittest.TestCase):
         self.assertEqual(zone2, 2)
 
 
+class TestIncremental(unittest.TestCase):
+
+    INVENTORY = {
+        'reference-architecture': ['private-compute-cloud'],
+        'internal-floating-ipaddr': '1.2.3.4/22',
+        'external-floating-ipaddr': '1.2.3.5/22',
+        'networks': {
+            'openstack-mgmt': {'addr': '1.2.0.0/22', 'bridge': 'br-mgmt',
+                               'eth-port': 'eth0'},
+            'openstack-stg': {'addr': '1.3.0.0/22', 'bridge': 'br-stg'},
+            'openstack-tenant-vxlan': {'addr': '1.4.0.0/22',
+                                       'bridge': 'br-vxlan'},
+            'openstack-tenant-vlan': {'addr': '1.5.0.0/22',
+                                      'bridge': 'br-vlan'},
+        },
+        'node-templates': {
+            'controllers': {'roles': ['controller']},
+            'compute': {'roles': ['compute']},
+            'ceph-osd': {'roles': ['ceph-osd']},
+        },
+        'nodes': {
+            'controllers': [{'hostname': 'c1',
+                             'openstack-mgmt-addr': '1.2.0.1/22',
+                             'openstack-stg-addr': '1.3.0.1/22'},
+                            {'hostname': 'c2',
+                             'openstack-mgmt-addr': '1.2.0.2/22',
+                             'openstack-stg-addr': '1.3.0.2/22'}],
+            'compute': [{'hostname': 'n1',
+                         'openstack-mgmt-addr': '1.2.0.11/22'}],
+            'ceph-osd': [{'hostname': 'o1',
+                          'openstack-mgmt-addr': '1.2.0.21/22'}],
+        },
+        'deployment-environment': {'http_proxy': 'http://1.2.3.6:3128'},
+    }
+
+    ALL_FILES = [guc.OSA_USER_CFG_FILE, guc.OSA_USER_VAR_HAPROXY,
+                 guc.OSA_USER_VAR_CEILOMETER, guc.OSA_USER_VAR_CEPH,
+                 guc.OSA_USER_VAR_DEPLOY_ENV]
+
+    def setUp(self):
+        super(TestIncremental, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.inv_name = path.join(self.tmp_dir, 'inventory.yml')
+        self.output_dir = path.join(self.tmp_dir, 'output')
+        os.mkdir(self.output_dir)
+        self.inventory = copy.deepcopy(self.INVENTORY)
+
+    def _process(self, incremental=True):
+        with open(self.inv_name, 'w') as stream:
+            yaml.safe_dump(self.inventory, stream)
+        return guc.process_inventory(self.inv_name, self.output_dir,
+                                     incremental)
+
+    def _read(self, fname):
+        with open(path.join(self.output_dir, fname)) as stream:
+            return stream.read()
+
+    def test_same_output_as_full_run(self):
+        self._process(incremental=False)
+        full = dict((fname, self._read(fname)) for fname in self.ALL_FILES)
+        for fname in self.ALL_FILES:
+            os.remove(path.join(self.output_dir, fname))
+
+        self.assertItemsEqual(self.ALL_FILES, self._process())
+        for fname in self.ALL_FILES:
+            self.assertEqual(full[fname], self._read(fname))
+
+    def test_unchanged(self):
+        self._process()
+        self.assertEqual([], self._process())
+
+    def test_node_of_unused_role_changed(self):
+        self._process()
+        self.inventory['nodes']['ceph-osd'].append({'hostname': 'o2'})
+        self.assertEqual([], self._process())
+
+    def test_compute_node_added(self):
+        self._process()
+        self.inventory['nodes']['compute'].append(
+            {'hostname': 'n2', 'openstack-mgmt-addr': '1.2.0.12/22'})
+        self.assertEqual([guc.OSA_USER_CFG_FILE], self._process())
+        self.assertIn('n2', self._read(guc.OSA_USER_CFG_FILE))
+
+    def test_deployment_environment_changed(self):
+        self._process()
+        self.inventory['deployment-environment']['http_proxy'] = (
+            'http://1.2.3.7:3128')
+        self.assertEqual([guc.OSA_USER_VAR_DEPLOY_ENV], self._process())
+        env = yaml.safe_load(self._read(guc.OSA_USER_VAR_DEPLOY_ENV))
+        self.assertEqual(
+            {'http_proxy': 'http://1.2.3.7:3128',
+             'no_proxy': 'localhost,127.0.0.1,1.2.3.4,1.2.3.5'},
+            env['deployment_environment_variables'])
+
+    def test_missing_file_regenerated(self):
+        self._process()
+        os.remove(path.join(self.output_dir, guc.OSA_USER_VAR_HAPROXY))
+        self.assertEqual([guc.OSA_USER_VAR_HAPROXY], self._process())
+
+    def test_network_changed(self):
+        self._process()
+        self.inventory['networks']['openstack-mgmt']['bridge'] = 'br-new'
+        self.assertEqual([guc.OSA_USER_CFG_FILE, guc.OSA_USER_VAR_HAPROXY,
+                          guc.OSA_USER_VAR_CEPH, guc.OSA_USER_VAR_DEPLOY_ENV],
+                         self._process())
+
+    def test_no_temporary_files_left(self):
+        self._process()
+        self._process()
+        self.assertItemsEqual(self.ALL_FILES + [guc.FINGERPRINTS_FILE],
+                              os.listdir(self.output_dir))
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        super(TestBatch, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_read_manifest(self):
+        manifest = path.join(self.tmp_dir, 'manifest')
+        with open(manifest, 'w') as stream:
+            stream.write('# site inventories\n'
+                         'site1/inventory.yml site1/etc\n'
+                         '\n'
+                         '  /abs/inventory.yml   /abs/etc  \n')
+        self.assertEqual(
+            [(path.join(self.tmp_dir, 'site1/inventory.yml'),
+              path.join(self.tmp_dir, 'site1/etc')),
+             ('/abs/inventory.yml', '/abs/etc')],
+            guc.read_manifest(manifest))
+
+    def test_read_manifest_invalid(self):
+        manifest = path.join(self.tmp_dir, 'manifest')
+        with open(manifest, 'w') as stream:
+            stream.write('inventory.yml\n')
+        self.assertRaises(ValueError, guc.read_manifest, manifest)
+
+    def test_get_inventory_pairs(self):
+        parser = guc.parse_command()
+        args = parser.parse_args(['-i', 'inv.yml'])
+        self.assertEqual([('inv.yml', '.')],
+                         guc.get_inventory_pairs(parser, args))
+
+        args = parser.parse_args(['-i', 'a.yml', '-d', 'a', '-i', 'b.yml',
+                                  '-d', 'b'])
+        self.assertEqual([('a.yml', 'a'), ('b.yml', 'b')],
+                         guc.get_inventory_pairs(parser, args))
+
+        args = parser.parse_args(['-i', 'a.yml', '-i', 'b.yml', '-d', 'a'])
+        with mock.patch('sys.stderr'):
+            self.assertRaises(SystemExit, guc.get_inventory_pairs, parser,
+                              args)
+
+    @mock.patch.object(guc, 'process_inventory')
+    def test_process_batch_isolates_failures(self, mock_process):
+        def fake_process(inv_name, output_dir, incremental):
+            if inv_name == 'bad.yml':
+                raise IOError('No such file')
+            if inv_name == 'noarch.yml':
+                sys.exit(1)
+
+        mock_process.side_effect = fake_process
+        pairs = [('a.yml', 'a'), ('bad.yml', 'b'), ('noarch.yml', 'c'),
+                 ('d.yml', 'd')]
+        with mock.patch('sys.stdout'):
+            failed = guc.process_batch(pairs, jobs=1, incremental=True)
+
+        self.assertEqual(2, failed)
+        self.assertEqual([mock.call(inv_name, output_dir, True)
+                          for inv_name, output_dir in pairs],
+                         mock_process.call_args_list)
+
+    def test_process_batch_parallel(self):
+        inventory = copy.deepcopy(TestIncremental.INVENTORY)
+        pairs = []
+        for site in ('site1', 'site2', 'site3'):
+            inv_name = path.join(self.tmp_dir, site + '.yml')
+            output_dir = path.join(self.tmp_dir, site)
+            os.mkdir(output_dir)
+            inventory['nodes']['compute'][0]['hostname'] = site + '-n1'
+            with open(inv_name, 'w') as stream:
+                yaml.safe_dump(inventory, stream)
+            pairs.append((inv_name, output_dir))
+
+        with mock.patch('sys.stdout'):
+            failed = guc.process_batch(pairs, jobs=2)
+
+        self.assertEqual(0, failed)
+        for site in ('site1', 'site2', 'site3'):
+            with open(path.join(self.tmp_dir, site,
+                                guc.OSA_USER_CFG_FILE)) as stream:
+                user_config = yaml.safe_load(stream)
+            self.assertEqual([site + '-n1'],
+                             user_config['compute_hosts'].keys())
+
+
 if __name__ == '__main__':
     unittest.main()
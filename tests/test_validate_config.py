@@ -17,12 +17,14 @@
 import copy
 from contextlib import contextmanager
 from StringIO import StringIO
+import json
 import os
 from os import path
 import sys
 
 import mock
 import unittest
+import yaml
 
 TOP_DIR = path.join(os.getcwd(), path.dirname(__file__), '..')
 SCRIPT_DIR = 'scripts'
@@ -117,7 +119,8 @@ class TestValidateConfig(unittest.TestCase):
         test_mod.validate_private_compute_cloud(config)
         get_r2t.assert_called_once_with(config)
         templates.assert_called_once_with(get_r2t.return_value)
-        networks.assert_called_once_with(config, get_r2t.return_value)
+        networks.assert_called_once_with(config, get_r2t.return_value,
+                                         errors=None)
 
     def test_validate_private_compute_cloud_node_templates(self):
         """ Validate that controller node's and compute node's templates
@@ -553,21 +556,39 @@ class TestValidateConfig(unittest.TestCase):
                                 test_mod.validate_ops_mgr,
                                 config)
 
+        # Test collecting a violation per template
+        config['node-templates']['b']['networks'].pop(0)
+        errors = []
+        test_mod.validate_ops_mgr(config, errors=errors)
+        self.assertEqual(['node-templates.a.networks',
+                          'node-templates.b.networks'],
+                         sorted(ex.path for ex in errors))
+
+    @mock.patch.object(test_mod, 'validate_nodes')
     @mock.patch.object(test_mod, 'validate_propagation_roles')
     @mock.patch.object(test_mod, 'validate_ops_mgr')
     @mock.patch.object(test_mod, 'validate_ceph')
     @mock.patch.object(test_mod, 'validate_swift')
+    @mock.patch.object(test_mod, 'validate_private_compute_cloud')
     @mock.patch.object(test_mod, 'validate_reference_architecture')
+    @mock.patch.object(test_mod, '_get_roles_to_templates')
     @mock.patch.object(test_mod, '_load_yml')
-    def test_validate(self, load, ra, swift, ceph, opsmgr, prop):
+    def test_validate(self, load, get_r2t, ra, pcc, swift, ceph, opsmgr,
+                      prop, nodes):
         file_path = 'path'
         test_mod.validate(file_path)
         load.assert_called_once_with(file_path)
-        ra.assert_called_once_with(load.return_value)
-        swift.assert_called_once_with(load.return_value)
-        ceph.assert_called_once_with(load.return_value)
-        opsmgr.assert_called_once_with(load.return_value)
-        prop.assert_called_once_with(load.return_value)
+        inv = load.return_value
+        # The roles to templates map is built once and shared
+        get_r2t.assert_called_once_with(inv)
+        r2t = get_r2t.return_value
+        ra.assert_called_once_with(inv)
+        pcc.assert_called_once_with(inv, r2t)
+        swift.assert_called_once_with(inv, r2t)
+        ceph.assert_called_once_with(inv, r2t)
+        opsmgr.assert_called_once_with(inv)
+        prop.assert_called_once_with(inv, r2t)
+        nodes.assert_called_once_with(inv)
 
     @mock.patch.object(test_mod, '_get_roles_to_templates')
     @mock.patch.object(test_mod, '_validate_ceph_node_templates')
@@ -587,8 +608,10 @@ class TestValidateConfig(unittest.TestCase):
         test_mod.validate_ceph(config)
         get_r2t.assert_called_once_with(config)
         templates.assert_called_once_with(get_r2t.return_value)
-        networks.assert_called_once_with(config, get_r2t.return_value)
-        devices.assert_called_once_with(config, get_r2t.return_value)
+        networks.assert_called_once_with(config, get_r2t.return_value,
+                                         errors=None)
+        devices.assert_called_once_with(config, get_r2t.return_value,
+                                        errors=None)
 
     def test_validate_ceph_mon_nodes(self):
         ports = {'ports': {'pxe': {'rack1': [1, 2, 3]}}}
@@ -760,7 +783,7 @@ class TestValidateConfig(unittest.TestCase):
                       'networks': {net: {}},
                       'node-templates': node_templ}
             self.assertRaisesRegexp(test_mod.UnsupportedConfig,
-                                    'are missing network',
+                                    'is missing network',
                                     test_mod._validate_ceph_networks,
                                     config, role_to_template)
         # Test when the network exists but ceph osd
@@ -776,7 +799,7 @@ class TestValidateConfig(unittest.TestCase):
                       'networks': {net: {}},
                       'node-templates': node_templ}
             self.assertRaisesRegexp(test_mod.UnsupportedConfig,
-                                    'are missing network',
+                                    'is missing network',
                                     test_mod._validate_ceph_networks,
                                     config, role_to_template)
 
@@ -884,6 +907,20 @@ class TestValidateConfig(unittest.TestCase):
         self.assertEqual(2, len(r2t.get('ceph-monitor')))
         self.assertEqual(1, len(r2t.get('ceph-osd')))
 
+        # Templates with the same contents are still separate templates
+        config = {'node-templates': {'a': {'roles': ['x']},
+                                     'b': {'roles': ['x']}}}
+        r2t = test_mod._get_roles_to_templates(config)
+        self.assertEqual(2, len(r2t['x']))
+
+    def test_has_converged_metadata_object_shared_map(self):
+        # The roles to templates map is shared between validators so it
+        # must be left as it was
+        nt = {'swift-metadata': {}, 'swift-object': {}}
+        r2t = test_mod._get_roles_to_templates({'node-templates': nt})
+        test_mod._has_converged_metadata_object({}, r2t)
+        self.assertEqual([nt['swift-metadata']], r2t['swift-metadata'])
+
     def test_validate_devices_lists(self):
         devices = ['/dev/sde',
                    '/dev/sdf',
@@ -891,47 +928,52 @@ class TestValidateConfig(unittest.TestCase):
                    '/dev/sdh',
                    '/dev/sdi']
         dk = 'device_key'
+
+        def named(*lists):
+            return [('t%d' % i, {'domain-settings': {dk: lst}})
+                    for i, lst in enumerate(lists)]
+
         # Test where the lists are equal
-        osd_tmpls = [{'domain-settings': {dk: devices}}]
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
+        osd_tmpls = named(devices, copy.deepcopy(devices),
+                          copy.deepcopy(devices), copy.deepcopy(devices))
         test_mod._validate_devices_lists(osd_tmpls, dk)
 
         # Test where one list on one host is shorter
-        osd_tmpls = [{'domain-settings': {dk: devices}}]
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
         devices2 = devices[:-2]
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices2)}})
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
+        osd_tmpls = named(devices, copy.deepcopy(devices),
+                          copy.deepcopy(devices), copy.deepcopy(devices2),
+                          copy.deepcopy(devices))
 
         self.assertRaises(test_mod.InvalidDeviceList,
                           test_mod._validate_devices_lists, osd_tmpls, dk)
 
         # Test where one of the lists is longer
-        osd_tmpls = [{'domain-settings': {dk: devices}}]
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
         devices2 = copy.deepcopy(devices).append('somethingMore')
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices2)}})
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
+        osd_tmpls = named(devices, copy.deepcopy(devices),
+                          copy.deepcopy(devices), copy.deepcopy(devices2),
+                          copy.deepcopy(devices))
 
         self.assertRaises(test_mod.InvalidDeviceList,
                           test_mod._validate_devices_lists, osd_tmpls, dk)
 
         # Test where one of the lists has a different value
-        osd_tmpls = [{'domain-settings': {dk: devices}}]
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
         devices2 = copy.deepcopy(devices)
         devices2[4] = '/different'
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices2)}})
-        osd_tmpls.append({'domain-settings': {dk: copy.deepcopy(devices)}})
+        osd_tmpls = named(devices, copy.deepcopy(devices),
+                          copy.deepcopy(devices), copy.deepcopy(devices2),
+                          copy.deepcopy(devices))
 
         self.assertRaises(test_mod.InvalidDeviceList,
                           test_mod._validate_devices_lists, osd_tmpls, dk)
 
+        # Each template which differs is reported when collecting
+        osd_tmpls = named(devices, devices2, devices[:-2], devices)
+        errors = []
+        test_mod._validate_devices_lists(osd_tmpls, dk, errors)
+        self.assertEqual(['node-templates.t1.domain-settings.device_key',
+                          'node-templates.t2.domain-settings.device_key'],
+                         [error.path for error in errors])
+
     def test_validate_propagation_roles(self):
         # Test good, non-converged case
         nts = {'controllers': {'roles': ['solution_keys',
@@ -977,5 +1019,237 @@ class TestValidateConfig(unittest.TestCase):
                                 test_mod.validate_propagation_roles,
                                 {'node-templates': nts})
 
+    def _nodes_inventory(self):
+        return {
+            'networks': {
+                'openstack-mgmt': {'addr': '172.29.236.0/22'},
+                'openstack-stg': {'addr': '172.29.244.0/22'},
+                'external1': {'method': 'manual'}},
+            'nodes': {
+                'controllers': [
+                    {'hostname': 'controller1',
+                     'openstack-mgmt-addr': '172.29.236.2',
+                     'openstack-stg-addr': '172.29.244.2',
+                     'external1-addr': '10.0.16.4',
+                     'external2-addr': ''}],
+                'ceph-osd': [
+                    {'hostname': 'ceph-osd1',
+                     'openstack-mgmt-addr': '172.29.236.3',
+                     'osd-devices': ['/dev/sde', '/dev/sdf'],
+                     'journal-devices': ['/dev/sdc']}],
+                'swift-object': [
+                    {'hostname': 'swift-object1',
+                     'openstack-mgmt-addr': '172.29.236.4',
+                     'domain-settings': {
+                         'object-ring-disks': ['sdb', 'sdc'],
+                         'account-ring-disks': ['sdb']}}]}}
+
+    def test_validate_nodes(self):
+        test_mod.validate_nodes({})
+        inv = self._nodes_inventory()
+        test_mod.validate_nodes(inv)
+
+        def check(error, message, path):
+            with self.assertRaisesRegexp(error, message) as cm:
+                test_mod.validate_nodes(inv)
+            self.assertEqual(path, cm.exception.path)
+
+        # The same host under several node templates
+        inv['nodes']['swift-object'][0]['hostname'] = 'ceph-osd1'
+        inv['nodes']['swift-object'][0]['openstack-mgmt-addr'] = (
+            '172.29.236.3')
+        test_mod.validate_nodes(inv)
+
+        # A hostname with different management addresses
+        inv['nodes']['swift-object'][0]['openstack-mgmt-addr'] = (
+            '172.29.236.4')
+        check(test_mod.UnsupportedConfig,
+              'hostname ceph-osd1 of node nodes.swift-object.0 is also used '
+              'by node nodes.ceph-osd.0, which has a different '
+              'openstack-mgmt-addr',
+              'nodes.swift-object.0.hostname')
+
+        # A management address with different hostnames
+        inv = self._nodes_inventory()
+        inv['nodes']['controllers'][0]['openstack-mgmt-addr'] = '172.29.236.3'
+        check(test_mod.UnsupportedConfig,
+              'openstack-mgmt-addr 172.29.236.3 of node '
+              'nodes.controllers.0 is also used by node nodes.ceph-osd.0, '
+              'which has a different hostname',
+              'nodes.controllers.0.openstack-mgmt-addr')
+
+        # A host listed twice in one node template
+        inv = self._nodes_inventory()
+        inv['nodes']['controllers'].append(
+            copy.deepcopy(inv['nodes']['controllers'][0]))
+        check(test_mod.UnsupportedConfig,
+              'hostname controller1 of node nodes.controllers.1 is also used '
+              'by node nodes.controllers.0 of the same node template',
+              'nodes.controllers.1.hostname')
+
+        # Address outside of its network, or not an address
+        inv = self._nodes_inventory()
+        inv['nodes']['controllers'][0]['openstack-stg-addr'] = '172.29.236.9'
+        check(test_mod.UnsupportedConfig,
+              'not within the openstack-stg network 172.29.244.0/22',
+              'nodes.controllers.0.openstack-stg-addr')
+        inv['nodes']['controllers'][0]['openstack-stg-addr'] = 'bogus'
+        check(test_mod.UnsupportedConfig, 'The address bogus',
+              'nodes.controllers.0.openstack-stg-addr')
+
+        # Device lists
+        inv = self._nodes_inventory()
+        inv['nodes']['ceph-osd'][0]['osd-devices'].append('/dev/sde')
+        check(test_mod.InvalidDeviceList, 'more than once',
+              'nodes.ceph-osd.0.osd-devices')
+        inv['nodes']['ceph-osd'][0]['osd-devices'] = ['/dev/sdc']
+        check(test_mod.InvalidDeviceList, '/dev/sdc of node nodes.ceph-osd.0',
+              'nodes.ceph-osd.0.journal-devices')
+        inv = self._nodes_inventory()
+        ds = inv['nodes']['swift-object'][0]['domain-settings']
+        ds['object-ring-disks'] = 'sdb'
+        check(test_mod.InvalidDeviceList, 'must be a list',
+              'nodes.swift-object.0.domain-settings.object-ring-disks')
+
+    def test_validate_nodes_sample_inventory(self):
+        # The all in one sample inventory lists its host as both a
+        # controller and a compute node
+        with open(path.join(TOP_DIR, 'osa', 'var', 'oprc',
+                            'inventory.yml')) as stream:
+            inv = yaml.safe_load(stream)
+        test_mod.validate_nodes(inv)
+
+    def test_validate_nodes_invalid_network(self):
+        inv = self._nodes_inventory()
+        inv['networks']['openstack-mgmt']['addr'] = 'bogus'
+        self.assertRaisesRegexp(test_mod.UnsupportedConfig,
+                                'invalid addr',
+                                test_mod.validate_nodes, inv)
+
+    def _bad_config(self):
+        return {'reference-architecture': ['dbaas', 'swift'],
+                'networks': {},
+                'node-templates': {'a': {'networks': []}}}
+
+    def test_validate_all(self):
+        # swift relies on the invalid reference architecture, so it is
+        # skipped; ops-mgr reports each of its violations
+        violations = test_mod.validate_all(self._bad_config())
+        self.assertEqual(['reference-architecture', 'ops-mgr', 'ops-mgr',
+                          'propagation-roles'],
+                         [v['group'] for v in violations])
+        self.assertEqual({'group': 'ops-mgr',
+                          'error': 'UnsupportedConfig',
+                          'message': 'The required openstack-mgmt network '
+                                     'openstack-mgmt is missing.',
+                          'path': 'networks.openstack-mgmt'},
+                         violations[1])
+        self.assertEqual('node-templates.a.networks', violations[2]['path'])
+
+        # The same violations are found when the groups run in parallel
+        self.assertEqual(violations,
+                         test_mod.validate_all(self._bad_config(), jobs=3))
+
+    def test_validate_all_no_node_templates(self):
+        config = self._bad_config()
+        config.pop('node-templates')
+        violations = test_mod.validate_all(config)
+        self.assertEqual(['node-templates', 'reference-architecture',
+                          'ops-mgr'],
+                         [v['group'] for v in violations])
+
+    def test_validate_all_no_reference_architecture(self):
+        config = self._bad_config()
+        config['reference-architecture'] = None
+        violations = test_mod.validate_all(config)
+        self.assertEqual(['reference-architecture', 'ops-mgr', 'ops-mgr',
+                          'propagation-roles'],
+                         [v['group'] for v in violations])
+
+    def test_validate_all_per_template_and_node(self):
+        config = self._nodes_inventory()
+        config['reference-architecture'] = ['swift']
+        config['node-templates'] = {
+            'a': {'networks': [], 'roles': ['solution_keys',
+                                            'solution_inventory']},
+            'b': {'networks': []}}
+        config['nodes']['controllers'][0]['openstack-stg-addr'] = 'bogus'
+        config['nodes']['ceph-osd'][0]['osd-devices'] = 'sde'
+        with mock.patch.object(test_mod, 'validate_swift'):
+            violations = test_mod.validate_all(config)
+        self.assertEqual(
+            [('ops-mgr', 'node-templates.a.networks'),
+             ('ops-mgr', 'node-templates.b.networks'),
+             ('nodes', 'nodes.ceph-osd.0.osd-devices'),
+             ('nodes', 'nodes.controllers.0.openstack-stg-addr')],
+            [(v['group'], v['path']) for v in violations])
+
+        # swift reports each node template missing its ring device lists
+        config['node-templates'] = {
+            'meta': {'networks': ['openstack-mgmt'],
+                     'roles': ['swift-metadata', 'solution_keys',
+                               'solution_inventory']},
+            'obj': {'networks': ['openstack-mgmt'],
+                    'roles': ['swift-object']}}
+        config.pop('nodes')
+        violations = test_mod.validate_all(config)
+        self.assertEqual(
+            [('swift',
+              'node-templates.meta.domain-settings.account-ring-devices'),
+             ('swift',
+              'node-templates.obj.domain-settings.object-ring-devices')],
+            [(v['group'], v['path']) for v in violations])
+        self.assertIn('node template obj ', violations[1]['message'])
+
+        # ceph reports each OSD node template without the storage network
+        # or osd-devices list
+        config['reference-architecture'] = [test_mod.CEPH]
+        config['networks']['ceph-public-storage'] = {}
+        net = ['openstack-mgmt', 'ceph-public-storage']
+        config['node-templates'] = {
+            'controllers': {'networks': net,
+                            'ports': {'pxe': {'rack1': [1]}},
+                            'roles': ['solution_keys',
+                                      'solution_inventory']},
+            'osd1': {'networks': ['openstack-mgmt'],
+                     'roles': ['ceph-osd']},
+            'osd2': {'networks': ['openstack-mgmt'],
+                     'roles': ['ceph-osd'],
+                     'domain-settings': {'osd-devices': ['/dev/sdb']}}}
+        violations = test_mod.validate_all(config)
+        self.assertEqual(
+            [('ceph', 'node-templates.osd1.networks'),
+             ('ceph', 'node-templates.osd2.networks'),
+             ('ceph', 'node-templates.osd1.domain-settings.osd-devices')],
+            [(v['group'], v['path']) for v in violations])
+
+    def test_validate_all_unexpected_error(self):
+        with mock.patch.object(test_mod, 'validate_swift') as swift:
+            swift.side_effect = KeyError('rings')
+            violations = test_mod.validate_all(
+                {'reference-architecture': ['swift'],
+                 'networks': {'openstack-mgmt': {}},
+                 'node-templates': {}})
+        self.assertIn({'group': 'swift', 'error': 'KeyError',
+                       'message': mock.ANY, 'path': None}, violations)
+
+    @mock.patch.object(test_mod.inventory_loader, 'load_file')
+    def test_report_all_json(self, load):
+        load.return_value = self._bad_config()
+        out = StringIO()
+        with mock.patch.object(sys, 'stdout', out):
+            self.assertEqual(4, test_mod.report_all('path', as_json=True))
+        report = json.loads(out.getvalue())
+        self.assertEqual('path', report['file'])
+        self.assertFalse(report['valid'])
+        self.assertEqual(4, len(report['violations']))
+
+        load.side_effect = IOError('No such file')
+        out = StringIO()
+        with mock.patch.object(sys, 'stdout', out):
+            self.assertEqual(1, test_mod.report_all('path', as_json=True))
+        self.assertEqual('load',
+                         json.loads(out.getvalue())['violations'][0]['group'])
+
 if __name__ == '__main__':
     unittest.main()